@@ -0,0 +1,145 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import pygame
+
+# Single-file asset bundle written by build_bundle.py
+BUNDLE_MAGIC = b'FBAB'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sII')
+BUNDLE_MIXER = (44100, -16, 2)
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and for PyInstaller """
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+class AssetBundle:
+    """ Memory-mapped bundle: one RGBA sprite atlas plus pre-decoded sounds """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = BUNDLE_HEADER.unpack_from(self.data)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} asset bundle")
+        start = BUNDLE_HEADER.size
+        self.index = json.loads(self.data[start:start + index_length])
+        self.data_offset = start + index_length
+        self.sprites = self.index['sprites']
+        self.sounds = self.index['sounds']
+        self.atlas = None
+
+    @classmethod
+    def open_if_present(cls, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error opening asset bundle {path}: {e}. Loading individual files.")
+            return None
+
+    def _blob(self, offset, length):
+        start = self.data_offset + offset
+        return memoryview(self.data)[start:start + length]
+
+    def image(self, name):
+        # The atlas is wrapped straight from the mapping and converted for the display once
+        if self.atlas is None:
+            width, height = self.index['atlas']['size']
+            pixels = self._blob(self.index['atlas']['offset'], width * height * 4)
+            self.atlas = pygame.image.frombuffer(pixels, (width, height), 'RGBA').convert_alpha()
+        return self.atlas.subsurface(self.sprites[name])
+
+    def sound(self, name):
+        # Raw samples only make sense if the mixer runs with the format they were decoded for
+        if pygame.mixer.get_init() != tuple(self.index['mixer']):
+            return None
+        entry = self.sounds[name]
+        return pygame.mixer.Sound(buffer=self._blob(entry['offset'], entry['length']))
+
+class AssetManager:
+    """ Loads every image and sound once and hands out shared references.
+    Surfaces are converted for the display on load, so a display mode must be
+    set before the first image is requested. With a bundle, sprites are cut
+    from its atlas and sounds come pre-decoded; anything missing from the
+    bundle is loaded from its own file. """
+
+    def __init__(self, bundle=None):
+        self.bundle = bundle
+        self.assets = {}
+        # name -> {'kind', 'load_ms', 'bytes'}
+        self.stats = {}
+
+    def _get(self, key, kind, load):
+        asset = self.assets.get(key)
+        if asset is None:
+            start = time.perf_counter()
+            asset = load()
+            load_ms = (time.perf_counter() - start) * 1000
+            self.assets[key] = asset
+            self.stats[key] = {'kind': kind, 'load_ms': load_ms, 'bytes': _footprint(asset)}
+        return asset
+
+    def image(self, path, alpha=True):
+        def load():
+            if self.bundle and path in self.bundle.sprites:
+                surface = self.bundle.image(path)
+                return surface if alpha else surface.convert()
+            surface = pygame.image.load(resource_path(path))
+            return surface.convert_alpha() if alpha else surface.convert()
+        return self._get(path if alpha else f'{path}#opaque', 'image', load)
+
+    def flipped(self, path, flip_x=False, flip_y=True):
+        return self._get(f'{path}#flip{int(flip_x)}{int(flip_y)}', 'image',
+                         lambda: pygame.transform.flip(self.image(path), flip_x, flip_y))
+
+    def scaled(self, path, size, alpha=True):
+        return self._get(f'{path}#{size[0]}x{size[1]}{"" if alpha else "#opaque"}', 'image',
+                         lambda: pygame.transform.scale(self.image(path, alpha), size))
+
+    def frames(self, path, frame_width, frame_height):
+        # Horizontal sprite sheet cut into subsurfaces sharing the sheet's pixels
+        def load():
+            sheet = self.image(path)
+            count = sheet.get_width() // frame_width
+            return [sheet.subsurface((i * frame_width, 0, frame_width, frame_height)) for i in range(count)]
+        return self._get(f'{path}#{frame_width}x{frame_height}', 'frames', load)
+
+    def sound(self, path):
+        def load():
+            if self.bundle and path in self.bundle.sounds:
+                sound = self.bundle.sound(path)
+                if sound is not None:
+                    return sound
+            return pygame.mixer.Sound(resource_path(path))
+        return self._get(path, 'sound', load)
+
+    def report(self):
+        return [dict(name=name, **stats) for name, stats in self.stats.items()]
+
+    def print_report(self):
+        total_ms = 0
+        total_bytes = 0
+        for entry in sorted(self.report(), key=lambda e: e['load_ms'], reverse=True):
+            total_ms += entry['load_ms']
+            total_bytes += entry['bytes']
+            print(f"{entry['name']:<50} {entry['kind']:<6} {entry['load_ms']:8.2f} ms {entry['bytes'] / 1024:9.1f} KiB")
+        print(f"{len(self.stats)} assets, {total_ms:.2f} ms, {total_bytes / 1024:.1f} KiB")
+
+def _footprint(asset):
+    # Approximate memory held by an asset; subsurfaces share their parent's pixels
+    if isinstance(asset, pygame.Surface):
+        return 0 if asset.get_parent() else asset.get_pitch() * asset.get_height()
+    if isinstance(asset, pygame.mixer.Sound):
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        return int(asset.get_length() * frequency) * channels * abs(sample_format) // 8
+    return 0
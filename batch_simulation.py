@@ -0,0 +1,285 @@
+import numpy as np
+import simulation
+from bird_registry import load_registry
+from simulation import (screen_width, screen_height, pipe_gap_size, min_pipe_spacing, pipes_per_difficulty_stage,
+                        difficulty_speed_increase, base_horizontal_pipe_speed, horizontal_pipe_speed_increase,
+                        base_pipe_horizontal_range, pipe_horizontal_range_increase, max_pipe_horizontal_range)
+
+# Pipe pair slots kept per game; pairs are recycled in spawn order
+max_pipe_pairs = 6
+
+def _round_like_rect(values):
+    # pygame.Rect rounds floats to the nearest integer; rounding half up differs only
+    # for exact negative halves, which occur only on pipes already leaving the screen
+    values += 0.5
+    return np.floor(values, out=values)
+
+class BatchSimulation:
+    """ N independent games stored as NumPy arrays and advanced together """
+
+    def __init__(self, num_games, bird_types='blue', seed=None, legacy_physics=False):
+        self.num_games = num_games
+        # Float positions as in the scalar simulation; legacy_physics rounds them every step
+        self.legacy_physics = legacy_physics
+        if isinstance(bird_types, str):
+            bird_types = [bird_types] * num_games
+        self.bird_types = list(bird_types)
+        self.rng = np.random.default_rng(seed)
+        self.spawn_interval_ticks = simulation.ms_to_ticks(simulation.pipe_spawn_interval)
+
+        # Per game physics columns from the bird registry the scalar simulation also uses
+        registry = load_registry()
+        self.gravity = np.array(registry.column('gravity', self.bird_types), dtype=np.float64)
+        self.flap_strength = np.array(registry.column('flap_strength', self.bird_types), dtype=np.float64)
+        self.horizontal_step = np.trunc(np.array(registry.column('horizontal_speed', self.bird_types), dtype=np.float64))
+
+        self.bird_width = simulation.Bird.width
+        self.bird_height = simulation.Bird.height
+        self.pipe_width = simulation.Pipe.width
+        self.pipe_height = simulation.Pipe.height
+        self.coin_size = simulation.Coin.width
+
+        self.reset()
+
+    def reset(self, seed=None):
+        n, k = self.num_games, max_pipe_pairs
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.tick = 0
+        self.spawn_timer = np.zeros(n, dtype=np.int64)
+        self.spawn_count = np.zeros(n, dtype=np.int64)
+
+        # Bird state; x/y are the top-left of the bird rect
+        self.bird_x = np.zeros(n, dtype=np.float64)
+        self.bird_y = np.zeros(n, dtype=np.float64)
+        self.velocity = np.zeros(n, dtype=np.float64)
+
+        # Game progress
+        self.alive = np.ones(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.coin_count = np.zeros(n, dtype=np.int64)
+        self.pipes_passed = np.zeros(n, dtype=np.int64)
+        self.difficulty_stage = np.zeros(n, dtype=np.int64)
+        self.pipe_move_speed = np.zeros(n, dtype=np.float64)
+        self.coins_collected = np.zeros(n, dtype=np.int64)
+        self.pipes_cleared = np.zeros(n, dtype=np.int64)
+
+        # Pipe pairs as (top/bottom, slot, game) so the game axis stays contiguous
+        self.pipe_x = np.zeros((2, k, n), dtype=np.float64)
+        self.pipe_initial_x = np.zeros((2, k, n), dtype=np.float64)
+        self.pipe_active = np.zeros((2, k, n), dtype=bool)
+        self.pipe_mover = np.zeros((2, k, n), dtype=bool)
+        self.pipe_forward = np.zeros((2, k, n), dtype=bool)
+        self.pipe_horizontal_speed = np.zeros((2, k, n), dtype=np.float64)
+        self.pipe_horizontal_range = np.zeros((2, k, n), dtype=np.float64)
+        self.pipe_gap_y = np.zeros((k, n), dtype=np.float64)
+        self.pipe_passed = np.zeros((k, n), dtype=bool)
+
+        # Coins, one optional coin per pipe pair slot; x/y are the top-left
+        self.coin_x = np.zeros((k, n), dtype=np.float64)
+        self.coin_y = np.zeros((k, n), dtype=np.float64)
+        self.coin_active = np.zeros((k, n), dtype=bool)
+
+        self.reset_games(np.arange(n))
+        return self.get_state()
+
+    def reset_games(self, games):
+        """ Start fresh games in the given slots (index array or bool mask) """
+        games = np.asarray(games)
+        if games.dtype == bool:
+            games = np.flatnonzero(games)
+        if games.size == 0:
+            return
+
+        self.spawn_timer[games] = 0
+        self.spawn_count[games] = 0
+        self.bird_x[games] = 50 - self.bird_width // 2
+        self.bird_y[games] = screen_height // 2 - self.bird_height // 2
+        self.velocity[games] = 0
+        self.alive[games] = True
+        self.steps[games] = 0
+        self.score[games] = 0
+        self.coin_count[games] = 0
+        self.pipes_passed[games] = 0
+        self.difficulty_stage[games] = 0
+        self.pipe_move_speed[games] = simulation.pipe_move_speed
+        self.pipe_active[:, :, games] = False
+        self.coin_active[:, games] = False
+
+        self.create_pipe_pairs(games)
+
+    def create_pipe_pairs(self, games):
+        n = len(games)
+        rng = self.rng
+        slot = self.spawn_count[games] % max_pipe_pairs
+        self.spawn_count[games] += 1
+
+        gap_y = rng.integers(100, screen_height - 100 - pipe_gap_size, endpoint=True, size=n)
+
+        # Keep new pipes at least min_pipe_spacing pixels away from existing ones
+        new_x = np.full(n, float(screen_width))
+        pipe_x = self.pipe_x[0][:, games]
+        pipe_active = self.pipe_active[0][:, games]
+        for other in range(max_pipe_pairs):
+            near = pipe_active[other] & (np.abs(pipe_x[other] - new_x) < min_pipe_spacing)
+            new_x = np.where(near, pipe_x[other] + min_pipe_spacing, new_x)
+
+        # Horizontal movers appear from the first difficulty stage on
+        stage = self.difficulty_stage[games]
+        is_mover = (stage > 0) & (rng.random(n) < np.minimum(0.2 * stage, 0.2))
+        move_both = rng.random(n) < 0.5
+        move_top = rng.random(n) < 0.5
+
+        self.pipe_x[:, slot, games] = new_x
+        self.pipe_initial_x[:, slot, games] = new_x
+        self.pipe_active[:, slot, games] = True
+        self.pipe_mover[0, slot, games] = is_mover & (move_both | move_top)
+        self.pipe_mover[1, slot, games] = is_mover & (move_both | ~move_top)
+        self.pipe_forward[:, slot, games] = rng.random((2, n)) < 0.5
+        self.pipe_horizontal_speed[:, slot, games] = base_horizontal_pipe_speed + stage * horizontal_pipe_speed_increase
+        self.pipe_horizontal_range[:, slot, games] = np.minimum(
+            base_pipe_horizontal_range + stage * pipe_horizontal_range_increase, max_pipe_horizontal_range)
+        self.pipe_gap_y[slot, games] = gap_y
+        self.pipe_passed[slot, games] = False
+
+        # Coins: 50% chance per pair, half of them inside the gap
+        has_coin = rng.random(n) < 0.5
+        in_gap = rng.random(n) < 0.5
+        half_gap = pipe_gap_size // 2
+        gap_coin_y = rng.integers(gap_y - half_gap + 30, gap_y + half_gap - 30, endpoint=True)
+        free_coin_y = rng.integers(50, screen_height - 50, endpoint=True, size=n)
+        coin_center_y = np.where(in_gap, gap_coin_y, free_coin_y)
+        coin_center_x = new_x + self.pipe_width + 20
+        self.coin_x[slot, games] = coin_center_x - self.coin_size // 2
+        self.coin_y[slot, games] = coin_center_y - self.coin_size // 2
+        self.coin_active[slot, games] = has_coin
+
+    def next_pipes(self, count=2):
+        """ x of the left edge and gap centre y of the next pipe pairs ahead of each bird,
+        nearest first, as arrays of shape (count, num_games); NaN where there is none """
+        ahead = self.pipe_active[1] & (self.pipe_x[1] + self.pipe_width >= self.bird_x)
+        distance = np.where(ahead, self.pipe_x[1], np.inf)
+        games = np.arange(self.num_games)
+        xs = np.full((count, self.num_games), np.nan)
+        gaps = np.full((count, self.num_games), np.nan)
+        for i in range(count):
+            nearest = distance.argmin(axis=0)
+            found = np.isfinite(distance[nearest, games])
+            xs[i] = np.where(found, self.pipe_x[1, nearest, games], np.nan)
+            gaps[i] = np.where(found, self.pipe_gap_y[nearest, games], np.nan)
+            distance[nearest, games] = np.inf
+        return xs, gaps
+
+    def step(self, actions):
+        """ Advance every live game by one tick; actions is a bool array of flaps """
+        alive = self.alive
+        if not alive.any():
+            self.coins_collected = np.zeros(self.num_games, dtype=np.int64)
+            self.pipes_cleared = np.zeros(self.num_games, dtype=np.int64)
+            return self.get_state()
+
+        self.tick += 1
+        flap = np.asarray(actions, dtype=bool) & alive
+        self.velocity = np.where(flap, self.flap_strength, self.velocity)
+
+        # Finished games stay as they ended, as the scalar simulation does: their
+        # spawn timers, pipes and coins do not move
+        self.spawn_timer += alive
+        due = self.spawn_timer >= self.spawn_interval_ticks
+        if due.any():
+            games = np.flatnonzero(due)
+            self.spawn_timer[games] = 0
+            self.create_pipe_pairs(games)
+
+        # Pipes scroll left, movers oscillate around their spawn x
+        legacy = self.legacy_physics
+        scroll = np.where(alive, self.pipe_move_speed, 0.0)
+        x = self.pipe_x
+        x -= scroll
+        if legacy:
+            _round_like_rect(x)
+        moving = self.pipe_active & self.pipe_mover & alive
+        if moving.any():
+            forward = moving & self.pipe_forward
+            backward = moving & ~self.pipe_forward
+            x += (forward.astype(np.int8) - backward) * self.pipe_horizontal_speed
+            if legacy:
+                _round_like_rect(x)
+            self.pipe_forward &= ~(forward & (x >= self.pipe_initial_x + self.pipe_horizontal_range))
+            self.pipe_forward |= backward & (x <= self.pipe_initial_x - self.pipe_horizontal_range)
+        # Collisions and scoring use whole pixel rects, as the scalar simulation does
+        pipe_x = x if legacy else _round_like_rect(x.copy())
+        self.pipe_active &= pipe_x + self.pipe_width >= 0
+
+        self.coin_x -= scroll
+        if legacy:
+            _round_like_rect(self.coin_x)
+        coin_x = self.coin_x if legacy else _round_like_rect(self.coin_x.copy())
+        self.coin_active &= coin_x + self.coin_size >= 0
+
+        # Bird physics, frozen for finished games
+        velocity = self.velocity + self.gravity
+        bird_y = self.bird_y + (np.trunc(velocity) if legacy else velocity)
+        bird_x = np.where(self.bird_x < 50, self.bird_x + 1, self.bird_x + self.horizontal_step)
+        hit_ceiling = bird_y < 0
+        bird_y[hit_ceiling] = 0
+        velocity[hit_ceiling] = 0
+        self.velocity = np.where(alive, velocity, self.velocity)
+        self.bird_y = np.where(alive, bird_y, self.bird_y)
+        self.bird_x = np.where(alive, bird_x, self.bird_x)
+
+        bx = self.bird_x
+        by = self.bird_y if legacy else _round_like_rect(self.bird_y.copy())
+        bird_right = bx + self.bird_width
+        bird_bottom = by + self.bird_height
+
+        # Coin pickup (AABB)
+        collected = (self.coin_active & alive
+                     & (bx < coin_x + self.coin_size) & (coin_x < bird_right)
+                     & (by < self.coin_y + self.coin_size) & (self.coin_y < bird_bottom))
+        self.coin_active &= ~collected
+        self.coins_collected = collected.sum(axis=0)
+        self.coin_count += self.coins_collected
+
+        # Pipe collision (AABB against both pipes of every pair)
+        half_gap = pipe_gap_size // 2
+        top_bottom_edge = self.pipe_gap_y - half_gap
+        bottom_top_edge = self.pipe_gap_y + half_gap
+        overlap_x = self.pipe_active & (bx < pipe_x + self.pipe_width) & (pipe_x < bird_right)
+        hit_top = overlap_x[0] & (by < top_bottom_edge) & (top_bottom_edge - self.pipe_height < bird_bottom)
+        hit_bottom = overlap_x[1] & (bottom_top_edge < bird_bottom) & (by < bottom_top_edge + screen_height * 2)
+        crashed = (hit_top | hit_bottom).any(axis=0)
+        crashed |= (bird_bottom >= screen_height) | (by <= 0)
+
+        # Scoring on the bottom pipe of each pair, as in the scalar simulation
+        cleared = self.pipe_active[1] & ~self.pipe_passed & alive & (pipe_x[1] + self.pipe_width < bx)
+        self.pipe_passed |= cleared
+        passed = cleared.sum(axis=0)
+        self.pipes_cleared = passed
+        self.score += passed
+        self.pipes_passed += passed
+        if passed.any():
+            stage = self.pipes_passed // pipes_per_difficulty_stage
+            self.pipe_move_speed *= difficulty_speed_increase ** (stage - self.difficulty_stage)
+            self.difficulty_stage = stage
+
+        self.steps += alive
+        self.alive = alive & ~crashed
+        return self.get_state()
+
+    def get_state(self):
+        return {
+            'tick': self.tick,
+            'bird_x': self.bird_x,
+            'bird_y': self.bird_y,
+            'bird_velocity': self.velocity,
+            'score': self.score,
+            'coin_count': self.coin_count,
+            'pipes_passed': self.pipes_passed,
+            'difficulty_stage': self.difficulty_stage,
+            'coins_collected': self.coins_collected,
+            'pipes_cleared': self.pipes_cleared,
+            'steps': self.steps,
+            'alive': self.alive,
+        }
@@ -0,0 +1,53 @@
+import argparse
+import random
+import time
+import simulation
+import tournament
+
+# Frame budget at the simulation tick rate, in microseconds
+tick_budget_us = 1_000_000 / simulation.frame_rate
+
+def play(sim, seeds, max_steps, noise=0.1):
+    # Same games in both modes: gap follower inputs with some random flaps,
+    # crashes ignored so every run spends max_steps ticks among the pipes
+    ticks = 0
+    elapsed = 0.0
+    crashes = 0
+    for seed in seeds:
+        sim.reset(seed=seed)
+        inputs = random.Random(seed)
+        for _ in range(max_steps):
+            flap = tournament.gap_follower_policy(sim) if inputs.random() > noise else inputs.random() < 0.5
+            start = time.perf_counter()
+            state = sim.step(flap)
+            elapsed += time.perf_counter() - start
+            ticks += 1
+            if state['done']:
+                crashes += 1
+                sim.game_over = False
+    return elapsed / ticks * 1_000_000, crashes
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-tick cost of rect and mask collision')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--steps', type=int, default=3000, help='ticks per game')
+    parser.add_argument('--budget-us', type=float, default=tick_budget_us / 100,
+                        help='allowed extra cost of mask collision per tick (default: 1%% of a tick)')
+    args = parser.parse_args()
+
+    seeds = range(args.games)
+    results = {}
+    for mode, mask_collision in (('rect', False), ('mask', True)):
+        sim = simulation.Simulation('blue', mask_collision=mask_collision)
+        play(sim, seeds[:1], 200)  # Warm up caches and masks
+        results[mode] = play(sim, seeds, args.steps)
+        tick_us, crashes = results[mode]
+        print(f"{mode:<5} {tick_us:7.2f} us/tick  ({tick_us / tick_budget_us:.3%} of a tick)  {crashes} crash ticks")
+
+    overhead = results['mask'][0] - results['rect'][0]
+    print(f"mask collision overhead {overhead:+.2f} us/tick, budget {args.budget_us:.2f} us")
+    if overhead > args.budget_us:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import compileall
+import os
+import statistics
+import subprocess
+import sys
+
+# Each measurement runs in a fresh interpreter so nothing is already imported.
+# pygame itself is imported first and timed separately: its own import cost
+# is the same with or without main.py.
+MEASURE = r'''
+import os, time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+start = time.perf_counter()
+import pygame
+pygame_ms = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+headless = not pygame.display.get_init() and not pygame.mixer.get_init()
+start = time.perf_counter()
+main.app.preload()
+preload_ms = (time.perf_counter() - start) * 1000
+print(pygame_ms, import_ms, preload_ms, int(headless))
+'''
+
+def measure(runs):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    # Time loading the game, not compiling it: on a fresh checkout, or with
+    # PYTHONDONTWRITEBYTECODE set, every run would otherwise compile main.py
+    # and its modules from source
+    compileall.compile_dir(directory, maxlevels=0, quiet=1)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', MEASURE], capture_output=True, text=True, check=True,
+                                cwd=directory).stdout
+        pygame_ms, import_ms, preload_ms, headless = output.split()[-4:]
+        samples.append((float(pygame_ms), float(import_ms), float(preload_ms), headless == '1'))
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost of importing main.py')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to time')
+    args = parser.parse_args()
+
+    samples = measure(args.runs)
+    for i, label in enumerate(['import pygame', 'import main', 'app.preload()']):
+        values = [sample[i] for sample in samples]
+        print(f"{label:<15} median {statistics.median(values):7.2f} ms   min {min(values):7.2f} ms")
+    if all(sample[3] for sample in samples):
+        print("import main left SDL video and audio uninitialized")
+    else:
+        print("import main initialized SDL video or audio")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import numpy as np
+import pygame
+import simulation
+import tournament
+from batch_simulation import BatchSimulation
+
+# Performance suite: every benchmark returns {metric: (value, unit, higher_is_better)}.
+# Metrics are compared against bench_baselines.json and fail when they are worse
+# than the baseline by more than the tolerance (per metric, or --threshold).
+# Baselines are machine specific: regenerate them with --update-baselines.
+baseline_file = 'bench_baselines.json'
+default_threshold = 0.30
+
+benchmarks = {}
+
+def benchmark(name):
+    def register(function):
+        benchmarks[name] = function
+        return function
+    return register
+
+def best_time(function, repeat):
+    # Fastest of several runs: the least disturbed by other work on the machine
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def median_time(function, repeat):
+    # Typical of several runs: for workloads long enough that a fastest-run
+    # minimum mostly measures luck with the scheduler
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def staged_simulation(stage, seed):
+    # A game already at the given difficulty stage
+    sim = simulation.Simulation('blue', seed)
+    # Upcoming pipes are generated at this stage too
+    sim.level = simulation.LevelGenerator(seed, lambda index: stage)
+    sim.difficulty_stage = stage
+    sim.pipes_passed_count = simulation.pipes_per_difficulty_stage * stage
+    sim.pipe_move_speed = simulation.pipe_move_speed * simulation.difficulty_speed_increase ** stage
+    return sim
+
+def play_ticks(sim, ticks, seed):
+    # Gap follower with some random inputs; crashes are ignored so every tick
+    # is spent among the pipes
+    inputs = random.Random(seed)
+    for _ in range(ticks):
+        flap = tournament.gap_follower_policy(sim) if inputs.random() > 0.1 else inputs.random() < 0.5
+        if sim.step(flap)['done']:
+            sim.game_over = False
+
+@benchmark('simulation')
+def bench_simulation(args):
+    results = {}
+    for stage in range(args.stages + 1):
+        # Same games every run: a fresh simulation and the same inputs
+        elapsed = median_time(lambda: play_ticks(staged_simulation(stage, stage), args.ticks, stage), args.repeats)
+        results[f'sim.ticks_per_sec.stage{stage}'] = (args.ticks / elapsed, 'ticks/s', True)
+
+    sim = staged_simulation(1, 0)
+    spawns = 2000
+
+    def spawn():
+        for _ in range(spawns):
+            sim.create_pipe_pair()
+            # Let the new pipes go back to the pools as they would when scrolling off
+            for sprite in sim.all_sprites.sprites():
+                if sprite is not sim.bird:
+                    sprite.kill()
+            sim.pipe_order.clear()
+            sim.coin_order.clear()
+            sim.moving_pipes = 0
+    results['sim.create_pipe_pair_us'] = (best_time(spawn, 5) / spawns * 1e6, 'us', False)
+    return results
+
+@benchmark('batch')
+def bench_batch(args):
+    batch = BatchSimulation(args.batch_games, seed=0)
+    actions = np.zeros(args.batch_games, dtype=bool)
+    steps = 200
+    batch.step(actions)
+
+    def run():
+        for i in range(steps):
+            actions[:] = (i % 20) == 0
+            batch.step(actions)
+            batch.reset_games(~batch.alive)
+    elapsed = best_time(run, 3)
+    return {'batch.game_ticks_per_sec': (steps * args.batch_games / elapsed, 'ticks/s', True)}
+
+@benchmark('collision')
+def bench_collision(args):
+    import bench_collision
+    rect_us, _ = bench_collision.play(simulation.Simulation('blue'), range(5), 1000)
+    mask_us, _ = bench_collision.play(simulation.Simulation('blue', mask_collision=True), range(5), 1000)
+    return {
+        'collision.rect_tick_us': (rect_us, 'us', False),
+        'collision.mask_tick_us': (mask_us, 'us', False),
+    }
+
+@benchmark('render')
+def bench_render(args):
+    import main
+    screen = main.app.screen
+    game = main.Game()
+    game.game_state = 'game_active'
+    game.sim.reset('blue', 0)
+    renderer = main.DirtyRenderer()
+    inputs = random.Random(0)
+
+    def frame():
+        flap = tournament.gap_follower_policy(game.sim) if inputs.random() > 0.1 else False
+        if game.sim.step(flap)['done']:
+            game.sim.reset('blue', inputs.randrange(2 ** 32))
+        game.base_x = (game.base_x - game.sim.pipe_move_speed) % -screen.get_width()
+
+    def full_frames():
+        for _ in range(args.frames):
+            frame()
+            game.background_x = (game.background_x - main.background_scroll_speed) % -screen.get_width()
+            main.draw_playfield(screen, game.sim, game.background_x, game.base_x)
+            game.display_score()
+            pygame.display.flip()
+
+    def dirty_frames():
+        for _ in range(args.frames):
+            frame()
+            pygame.display.update(renderer.draw(screen, game))
+
+    results = {}
+    for name, frames in (('full', full_frames), ('dirty', dirty_frames)):
+        frames()  # Warm up caches
+        results[f'render.fps.{name}'] = (args.frames / best_time(frames, 3), 'fps', True)
+    return results
+
+@benchmark('startup')
+def bench_startup(args):
+    import bench_import
+    samples = bench_import.measure(args.startup_runs)
+    # Import time depends on the machine's disk and CPU, so it is gated as a
+    # multiple of importing pygame in the same interpreter
+    return {
+        'startup.import_main_per_pygame': (statistics.median(s[1] / s[0] for s in samples), 'x', False),
+        'startup.preload_ms': (statistics.median(s[2] for s in samples), 'ms', False),
+    }
+
+@benchmark('assets')
+def bench_assets(args):
+    import main
+    from asset_manager import AssetManager, AssetBundle
+    main.app.screen
+
+    def load(bundle):
+        # A fresh manager has nothing cached
+        manager = AssetManager(bundle)
+        main.GameImages(manager)
+        main.GameSounds(manager)
+
+    results = {'assets.load_files_ms': (best_time(lambda: load(None), 5) * 1000, 'ms', False)}
+    if os.path.exists('assets.bundle'):
+        results['assets.load_bundle_ms'] = (best_time(lambda: load(AssetBundle('assets.bundle')), 5) * 1000, 'ms', False)
+    return results
+
+@benchmark('persistence')
+def bench_persistence(args):
+    from bird_manager import BirdManager
+    from bird_registry import load_registry
+    # The registry is cached on first load and read relative to the working
+    # directory, so it has to be loaded before moving to the empty one
+    load_registry()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            manager = BirdManager()
+            manager.high_scores['blue'] = 12
+
+            def save_and_flush():
+                manager.save_progress()
+                manager.store.flush()
+            # save_progress() only queues the write; commit waits until it is on disk
+            save = best_time(manager.save_progress, 20)
+            commit = best_time(save_and_flush, 20)
+            load = best_time(BirdManager, 20)
+        finally:
+            os.chdir(cwd)
+    return {
+        'persistence.bird_manager_save_ms': (save * 1000, 'ms', False),
+        'persistence.bird_manager_commit_ms': (commit * 1000, 'ms', False),
+        'persistence.bird_manager_load_ms': (load * 1000, 'ms', False),
+    }
+
+@benchmark('history')
+def bench_history(args):
+    import run_history
+    inputs = random.Random(0)
+    birds = ('blue', 'red', 'yellow')
+    rows = [(time.time(), f'2026-01-{inputs.randint(1, 28):02}', inputs.choice(birds), inputs.randint(0, 300),
+             0, 0, 0, 0, 0) for _ in range(args.history_runs)]
+    with tempfile.TemporaryDirectory() as directory:
+        connection = run_history.connect(os.path.join(directory, 'history.db'))
+
+        def insert():
+            with connection:
+                connection.executemany(run_history.INSERT, rows)
+        inserted = best_time(insert, 1)
+        # Leaderboard queries against a table that already holds many runs
+        top = best_time(lambda: run_history.top_runs(connection, 10), 20)
+        per_bird = best_time(lambda: run_history.top_runs(connection, 10, bird_type='red'), 20)
+        per_day = best_time(lambda: run_history.top_runs(connection, 10, day='2026-01-14'), 20)
+        connection.close()
+    return {
+        'history.insert_runs_per_sec': (len(rows) / inserted, 'runs/s', True),
+        'history.top_ms': (top * 1000, 'ms', False),
+        'history.top_by_bird_ms': (per_bird * 1000, 'ms', False),
+        'history.top_by_day_ms': (per_day * 1000, 'ms', False),
+    }
+
+def compare(metric, value, higher_is_better, baselines, threshold):
+    baseline = baselines.get(metric)
+    if baseline is None:
+        return None, None, 'new'
+    reference = baseline['value']
+    change = (value - reference) / reference if reference else 0.0
+    tolerance = baseline.get('tolerance', threshold)
+    worse = -change if higher_is_better else change
+    return reference, change, 'fail' if worse > tolerance else 'pass'
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the performance benchmarks and check them against baselines')
+    parser.add_argument('--only', nargs='+', choices=sorted(benchmarks), help='benchmarks to run (default: all)')
+    parser.add_argument('--output', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--baselines', default=baseline_file, help='baseline file')
+    parser.add_argument('--update-baselines', action='store_true', help='store these results as the new baselines')
+    parser.add_argument('--threshold', type=float, default=default_threshold,
+                        help='allowed slowdown as a fraction for metrics without their own tolerance')
+    parser.add_argument('--stages', type=int, default=5, help='highest difficulty stage to time')
+    parser.add_argument('--ticks', type=int, default=20000, help='simulation ticks per stage')
+    parser.add_argument('--repeats', type=int, default=7, help='runs per stage, of which the median is kept')
+    parser.add_argument('--frames', type=int, default=300, help='frames per render benchmark')
+    parser.add_argument('--batch-games', type=int, default=10000)
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--history-runs', type=int, default=100000, help='runs stored before timing leaderboard queries')
+    args = parser.parse_args()
+
+    # Assets and the baseline file are relative to the repository
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with open(args.baselines) as f:
+            baselines = json.load(f)['metrics']
+    except (IOError, ValueError, KeyError):
+        baselines = {}
+
+    metrics = {}
+    for name in args.only or benchmarks:
+        start = time.perf_counter()
+        for metric, (value, unit, higher_is_better) in benchmarks[name](args).items():
+            reference, change, status = compare(metric, value, higher_is_better, baselines, args.threshold)
+            metrics[metric] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better,
+                               'baseline': reference, 'change': change, 'status': status}
+            change_text = f"{change:+7.1%}" if change is not None else '    new'
+            print(f"{metric:<38} {value:12.2f} {unit:<8} {change_text}  {status}")
+        print(f"  ({name}: {time.perf_counter() - start:.1f}s)")
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'metrics': metrics,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baselines:
+        for metric, result in metrics.items():
+            entry = baselines.setdefault(metric, {})
+            entry['value'] = round(result['value'], 4)
+            entry['unit'] = result['unit']
+        with open(args.baselines, 'w') as f:
+            json.dump({'platform': results['platform'], 'metrics': baselines}, f, indent=2, sort_keys=True)
+        print(f"Baselines written to {args.baselines}")
+        return
+
+    failures = [metric for metric, result in metrics.items() if result['status'] == 'fail']
+    if failures:
+        print(f"{len(failures)} regression(s): {', '.join(failures)}")
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
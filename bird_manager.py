@@ -1,45 +1,29 @@
-import json
-import os
+from save_store import SaveStore
+from bird_registry import load_registry
 
 class BirdManager:
-    def __init__(self):
-        self.progress_file = 'bird_progress.json'
-        self.unlocked_birds = {'red', 'yellow', 'blue'}
-        self.achievements = {
-            'red': {'name': 'Speed Demon', 'requirement': 50, 'description': 'Moves faster horizontally.'},
-            'yellow': {'name': 'Heavy Lifter', 'requirement': 30, 'description': 'Stronger flap, falls faster.'},
-            'blue': {'name': 'Graceful Glider', 'requirement': 40, 'description': 'Falls more gently.'}
-        }
-        self.high_scores = {
-            'red': 0,
-            'yellow': 0,
-            'blue': 0,
-            'default': 0
-        }
+    def __init__(self, store=None):
+        # Progress is kept in the shared save store
+        self.store = store if store is not None else SaveStore()
+        # Bird types and their unlock requirements come from the bird registry (birds.json)
+        self.registry = load_registry()
+        birds = [self.registry.get(name) for name in self.registry.names]
+        self.unlocked_birds = {bird.name for bird in birds if bird.unlocked}
+        self.achievements = {bird.name: bird.achievement for bird in birds if bird.achievement}
+        self.high_scores = {bird.name: 0 for bird in birds}
+        self.high_scores['default'] = 0
         self.load_progress()
 
     def load_progress(self):
-        try:
-            if os.path.exists('bird_progress.json'):
-                with open('bird_progress.json', 'r') as f:
-                    data = json.load(f)
-                    self.unlocked_birds = data.get('unlocked_birds', {'default': True})
-                    self.high_scores = data.get('high_scores', self.high_scores)
-        except Exception as e:
-            print(f"Error loading progress: {e}")
+        self.unlocked_birds |= set(self.store.get('unlocked_birds', []))
+        self.high_scores.update(self.store.get('bird_high_scores', {}))
 
     def save_progress(self):
-        try:
-            with open('bird_progress.json', 'w') as f:
-                json.dump({
-                    'unlocked_birds': self.unlocked_birds,
-                    'high_scores': self.high_scores
-                }, f)
-        except Exception as e:
-            print(f"Error saving progress: {e}")
+        # Queued for the background writer; returns without touching the disk
+        self.store.update(unlocked_birds=sorted(self.unlocked_birds), bird_high_scores=dict(self.high_scores))
 
     def update_score(self, bird_type, score):
-        if score > self.high_scores[bird_type]:
+        if score > self.high_scores.get(bird_type, 0):
             self.high_scores[bird_type] = score
             self.check_achievements(bird_type, score)
             self.save_progress()
@@ -47,16 +31,15 @@ class BirdManager:
     def check_achievements(self, bird_type, score):
         if bird_type in self.achievements:
             if score >= self.achievements[bird_type]['requirement']:
-                self.unlocked_birds[bird_type] = True
-                self.save_progress()
+                self.unlocked_birds.add(bird_type)
 
     def is_bird_unlocked(self, bird_type):
         return bird_type in self.unlocked_birds
 
     def get_available_birds(self):
-        return ['red', 'yellow', 'blue']
+        return list(self.registry.names)
 
     def get_bird_achievement_info(self, bird_type):
         if bird_type in self.achievements:
             return self.achievements[bird_type]
-        return None 
\ No newline at end of file
+        return None 
@@ -0,0 +1,67 @@
+import json
+from collections import namedtuple
+from functools import lru_cache
+from asset_manager import resource_path
+
+# Bird types are described in birds.json: wing frames, physics and how each one
+# is unlocked. The file is read once and compiled into lookup tables shared by
+# the simulation, the batched simulator and BirdManager, so a new bird only
+# needs a new entry there (and its sprites).
+registry_file = 'birds.json'
+REGISTRY_VERSION = 1
+
+BirdType = namedtuple('BirdType', ['name', 'sprites', 'gravity', 'flap_strength', 'horizontal_speed',
+                                   'unlocked', 'achievement'])
+
+# The only bird available when birds.json cannot be read
+fallback_bird = BirdType('blue', tuple(f'assets/sprites/bluebird-{flap}flap.png' for flap in ('down', 'mid', 'up')),
+                         0.25, -6, 0, True, None)
+
+class BirdRegistry:
+    """ Bird types by name, in the order the file lists them. Unknown names
+    resolve to the default bird. """
+
+    def __init__(self, bird_types, default):
+        self.types = {bird.name: bird for bird in bird_types}
+        self.names = [bird.name for bird in bird_types]
+        self.default = self.types[default]
+
+    def get(self, bird_type):
+        return self.types.get(bird_type, self.default)
+
+    def column(self, field, bird_types):
+        """ One attribute for each of bird_types, e.g. to build a numpy array per game """
+        return [getattr(self.get(bird_type), field) for bird_type in bird_types]
+
+def compile_registry(data):
+    if data.get('version') != REGISTRY_VERSION:
+        raise ValueError(f"expected version {REGISTRY_VERSION}, found {data.get('version')}")
+    bird_types = []
+    for entry in data['birds']:
+        for field in ('gravity', 'flap_strength', 'horizontal_speed'):
+            if not isinstance(entry[field], (int, float)):
+                raise ValueError(f"{entry['name']}: {field} must be a number")
+        if not entry['sprites']:
+            raise ValueError(f"{entry['name']}: no sprites")
+        bird_types.append(BirdType(
+            name=entry['name'],
+            sprites=tuple(entry['sprites']),
+            gravity=entry['gravity'],
+            flap_strength=entry['flap_strength'],
+            horizontal_speed=entry['horizontal_speed'],
+            unlocked=entry.get('unlocked', False),
+            achievement=entry.get('achievement'),
+        ))
+    return BirdRegistry(bird_types, data.get('default', bird_types[0].name))
+
+@lru_cache(maxsize=None)
+def load_registry(path=registry_file):
+    try:
+        with open(resource_path(path), 'r') as f:
+            return compile_registry(json.load(f))
+    except (IOError, ValueError, KeyError, TypeError, IndexError) as e:
+        print(f"Error loading bird registry: {e}. Only the default bird is available.")
+        return BirdRegistry([fallback_bird], fallback_bird.name)
+
+def get_bird(bird_type):
+    return load_registry().get(bird_type)
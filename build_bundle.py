@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import pygame
+from asset_manager import BUNDLE_MAGIC, BUNDLE_VERSION, BUNDLE_HEADER, BUNDLE_MIXER
+
+# Pack every sprite into one RGBA atlas and every sound effect into raw PCM,
+# written together as a single bundle file the game can memory-map at startup.
+# Layout: header (magic, version, index length), JSON index, then 16-byte
+# aligned blobs: the atlas pixels followed by each sound's samples.
+
+ATLAS_WIDTH = 1024
+PADDING = 1
+
+def pack_shelves(sizes, width):
+    # Simple shelf packing, tallest images first; returns name -> (x, y) and atlas height
+    positions = {}
+    x = y = shelf_height = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + w > width:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        positions[name] = (x, y)
+        x += w + PADDING
+        shelf_height = max(shelf_height, h)
+    return positions, y + shelf_height
+
+def _align(data, alignment=16):
+    data.extend(b'\0' * (-len(data) % alignment))
+
+def build_bundle(asset_dir='assets', output='assets.bundle'):
+    sprites = {}
+    sprite_dir = os.path.join(asset_dir, 'sprites')
+    for filename in sorted(os.listdir(sprite_dir)):
+        if filename.endswith('.png'):
+            sprites[f'{asset_dir}/sprites/{filename}'] = pygame.image.load(os.path.join(sprite_dir, filename))
+
+    positions, atlas_height = pack_shelves({name: image.get_size() for name, image in sprites.items()}, ATLAS_WIDTH)
+    atlas = pygame.Surface((ATLAS_WIDTH, atlas_height), pygame.SRCALPHA, 32)
+    atlas.fill((0, 0, 0, 0))
+    for name, image in sprites.items():
+        atlas.blit(image, positions[name])
+    atlas_pixels = pygame.image.tobytes(atlas, 'RGBA')
+
+    # Sounds are decoded with the mixer settings the game runs with
+    pygame.mixer.quit()
+    pygame.mixer.init(*BUNDLE_MIXER)
+    sounds = {}
+    audio_dir = os.path.join(asset_dir, 'audio')
+    for filename in sorted(os.listdir(audio_dir)):
+        if filename.endswith('.ogg'):
+            sounds[f'{asset_dir}/audio/{filename}'] = pygame.mixer.Sound(os.path.join(audio_dir, filename)).get_raw()
+
+    # Blob offsets are relative to the start of the data section
+    data = bytearray(atlas_pixels)
+    _align(data)
+    sound_index = {}
+    for name, samples in sounds.items():
+        sound_index[name] = {'offset': len(data), 'length': len(samples)}
+        data.extend(samples)
+        _align(data)
+
+    index = {
+        'atlas': {'offset': 0, 'size': [ATLAS_WIDTH, atlas_height]},
+        'sprites': {name: [*positions[name], *image.get_size()] for name, image in sprites.items()},
+        'sounds': sound_index,
+        'mixer': list(pygame.mixer.get_init()),
+    }
+    index_bytes = bytearray(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+    # Pad the index so the data section starts 16-byte aligned
+    index_bytes.extend(b' ' * (-(BUNDLE_HEADER.size + len(index_bytes)) % 16))
+
+    with open(output, 'wb') as f:
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(data)
+    return len(sprites), len(sounds), (ATLAS_WIDTH, atlas_height)
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack sprites into an atlas and sounds into one asset bundle')
+    parser.add_argument('--assets', default='assets', help='asset directory')
+    parser.add_argument('--output', default='assets.bundle', help='bundle file to write')
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    start = time.perf_counter()
+    sprite_count, sound_count, atlas_size = build_bundle(args.assets, args.output)
+    size_kib = os.path.getsize(args.output) / 1024
+    print(f"Packed {sprite_count} sprites into a {atlas_size[0]}x{atlas_size[1]} atlas and {sound_count} sounds "
+          f"into {args.output} ({size_kib:.0f} KiB) in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import simulation
+from batch_simulation import BatchSimulation
+from simulation import screen_width, screen_height
+
+# Observation layout shared by FlappyEnv and VectorFlappyEnv:
+#   bird y, bird velocity, then (x distance, gap centre y) of the next two pipe pairs
+OBSERVATION_SIZE = 6
+NO_PIPE_DISTANCE = float(screen_width)
+NO_PIPE_GAP_Y = float(screen_height // 2)
+
+# Episodes are truncated after 10 minutes of game time
+default_max_steps = simulation.frame_rate * 60 * 10
+
+class FlappyEnv:
+    """ Gym-style single game environment backed by the headless Simulation.
+    Action 1 flaps, 0 does nothing. With render_mode='rgb_array' observations
+    are HxWx3 pixel arrays drawn to an offscreen surface instead of vectors. """
+
+    def __init__(self, bird_type='blue', coin_reward=0.5, max_steps=default_max_steps, render_mode=None):
+        self.bird_type = bird_type
+        self.coin_reward = coin_reward
+        self.max_steps = max_steps
+        self.render_mode = render_mode
+        self.renderer = None
+
+        if render_mode == 'rgb_array':
+            self.renderer = _OffscreenRenderer()
+            self.sim = self.renderer.create_simulation(bird_type)
+        elif render_mode is None:
+            self.sim = simulation.Simulation(bird_type)
+        else:
+            raise ValueError(f"Unsupported render mode: {render_mode}")
+
+    def reset(self, seed=None, bird_type=None):
+        if bird_type is not None:
+            self.bird_type = bird_type
+        state = self.sim.reset(self.bird_type, seed)
+        if self.renderer:
+            self.renderer.reset()
+        return self._observe(), self._info(state)
+
+    def step(self, action):
+        state = self.sim.step(bool(action))
+        if self.renderer:
+            self.renderer.advance(self.sim)
+        reward = state['pipes_cleared'] + self.coin_reward * state['coins_collected']
+        terminated = state['done']
+        truncated = not terminated and state['tick'] >= self.max_steps
+        return self._observe(), reward, terminated, truncated, self._info(state)
+
+    def render(self):
+        if self.renderer:
+            return self.renderer.draw(self.sim)
+        return None
+
+    def _observe(self):
+        if self.renderer:
+            return self.renderer.draw(self.sim)
+        observation = np.empty(OBSERVATION_SIZE, dtype=np.float32)
+        bird = self.sim.bird
+        # Float positions, not the rounded rects, as VectorFlappyEnv observes them
+        observation[0] = bird.y
+        observation[1] = bird.velocity
+        next_pipes = self.sim.next_pipes(2)
+        for i in range(2):
+            if i < len(next_pipes):
+                pipe = next_pipes[i]
+                observation[2 + i * 2] = pipe.x - bird.x
+                observation[3 + i * 2] = pipe.y - simulation.pipe_gap_size // 2
+            else:
+                observation[2 + i * 2] = NO_PIPE_DISTANCE
+                observation[3 + i * 2] = NO_PIPE_GAP_Y
+        return observation
+
+    def _info(self, state):
+        return {
+            'score': state['score'],
+            'coin_count': state['coin_count'],
+            'difficulty_stage': state['difficulty_stage'],
+            'seed': self.sim.seed,
+        }
+
+class VectorFlappyEnv:
+    """ Many games stepped together by BatchSimulation. Finished games are
+    reset automatically inside step(); their last observation is returned
+    in info['final_observation']. """
+
+    def __init__(self, num_envs, bird_types='blue', coin_reward=0.5, max_steps=default_max_steps, seed=None):
+        self.num_envs = num_envs
+        self.coin_reward = coin_reward
+        self.max_steps = max_steps
+        self.batch = BatchSimulation(num_envs, bird_types, seed)
+
+    def reset(self, seed=None):
+        self.batch.reset(seed)
+        return self._observe(), {}
+
+    def step(self, actions):
+        batch = self.batch
+        state = batch.step(np.asarray(actions, dtype=bool))
+        reward = (state['pipes_cleared'] + self.coin_reward * state['coins_collected']).astype(np.float32)
+        terminated = ~state['alive']
+        truncated = state['alive'] & (state['steps'] >= self.max_steps)
+        done = terminated | truncated
+        info = {'score': state['score'].copy()}
+        if done.any():
+            info['final_observation'] = self._observe()
+            batch.reset_games(done)
+        return self._observe(), reward, terminated, truncated, info
+
+    def _observe(self):
+        batch = self.batch
+        observation = np.empty((self.num_envs, OBSERVATION_SIZE), dtype=np.float32)
+        observation[:, 0] = batch.bird_y
+        observation[:, 1] = batch.velocity
+        xs, gaps = batch.next_pipes(2)
+        for i in range(2):
+            observation[:, 2 + i * 2] = np.where(np.isnan(xs[i]), NO_PIPE_DISTANCE, xs[i] - batch.bird_x)
+            observation[:, 3 + i * 2] = np.where(np.isnan(gaps[i]), NO_PIPE_GAP_Y, gaps[i])
+        return observation
+
+class _OffscreenRenderer:
+    # Draws with the game's own sprites onto a Surface that is never shown
+
+    def __init__(self):
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        import pygame
+        import main
+        self.pygame = pygame
+        self.main = main
+        self.surface = pygame.Surface((screen_width, screen_height))
+        self.background_x = 0
+        self.base_x = 0
+
+    def create_simulation(self, bird_type):
+        return self.main.GameSimulation(bird_type)
+
+    def reset(self):
+        self.background_x = 0
+        self.base_x = 0
+
+    def advance(self, sim):
+        self.base_x -= sim.pipe_move_speed
+        if self.base_x <= -screen_width:
+            self.base_x = 0
+        self.background_x -= self.main.background_scroll_speed
+        if self.background_x <= -screen_width:
+            self.background_x = 0
+
+    def draw(self, sim):
+        self.main.draw_playfield(self.surface, sim, self.background_x, self.base_x)
+        # surfarray is (width, height, 3); observations are row major
+        return self.pygame.surfarray.array3d(self.surface).transpose(1, 0, 2)
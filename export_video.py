@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import os
+import queue
+import sys
+import threading
+import time
+
+# Frames are drawn offscreen, so no display or sound device is needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import numpy as np
+import pygame
+import replay
+import simulation
+import tournament
+from simulation import screen_width, screen_height, frame_rate
+
+# Renders replays through the game's own draw path (Game.draw_frame) and writes
+# the frames as raw RGB (to a file, a pipe or stdout, e.g. for ffmpeg), a PNG
+# sequence or .npy chunks. Drawing and writing run on separate threads joined by
+# a bounded queue, so encoding overlaps rendering without frames piling up.
+queue_frames = 64
+npy_chunk_frames = 300
+tail_seconds = 1.0  # Game over screen kept at the end of each clip
+
+class RawWriter:
+    """ Frames back to back as 8-bit RGB, rows top to bottom """
+
+    def __init__(self, stream, close_stream=True):
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def write(self, index, frame):
+        self.stream.write(frame)
+
+    def close(self):
+        self.stream.flush()
+        if self.close_stream:
+            self.stream.close()
+
+class PngWriter:
+    """ One numbered PNG per frame in a directory """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, frame):
+        surface = pygame.image.frombuffer(frame, (screen_width, screen_height), 'RGB')
+        pygame.image.save(surface, os.path.join(self.directory, f'{index:05}.png'))
+
+    def close(self):
+        pass
+
+class NpyWriter:
+    """ Arrays of shape (frames, height, width, 3), chunk_frames frames per file """
+
+    def __init__(self, directory, chunk_frames=npy_chunk_frames):
+        self.directory = directory
+        self.chunk_frames = chunk_frames
+        self.frames = []
+        self.chunks = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, frame):
+        self.frames.append(np.frombuffer(frame, dtype=np.uint8).reshape(screen_height, screen_width, 3))
+        if len(self.frames) == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self.frames:
+            np.save(os.path.join(self.directory, f'chunk_{self.chunks:05}.npy'), np.stack(self.frames))
+            self.chunks += 1
+            self.frames = []
+
+    def close(self):
+        self.flush()
+
+def render_frames(clip, fps=frame_rate, tail=tail_seconds):
+    """ RGB bytes of every frame of a replay played back at fps, drawn exactly as
+    the game draws it, followed by tail seconds of the game over screen """
+    import main
+    screen = main.app.screen
+    game = main.Game(playback=clip)
+    frame_ms = 1000 / fps
+    tail_frames = round(tail * fps)
+    while tail_frames > 0:
+        if game.game_state == 'game_active':
+            for _ in range(game.timestep.advance(frame_ms)):
+                game.update_game()
+                if game.game_state != 'game_active':
+                    break
+        else:
+            tail_frames -= 1
+        game.draw_frame(screen, frame_ms)
+        yield pygame.image.tostring(screen, 'RGB')
+
+def export_clip(clip, writer, fps=frame_rate, tail=tail_seconds, max_queued=queue_frames):
+    """ Render a replay into writer; returns the number of frames """
+    frames = queue.Queue(maxsize=max_queued)
+    errors = []
+
+    def drain():
+        index = 0
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            # After a write error keep taking frames, so the renderer is never stuck on a full queue
+            if not errors:
+                try:
+                    writer.write(index, frame)
+                except (IOError, ValueError, pygame.error) as e:
+                    errors.append(e)
+            index += 1
+        try:
+            writer.close()
+        except (IOError, ValueError) as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=drain, name='frame-writer', daemon=True)
+    thread.start()
+    count = 0
+    try:
+        for frame in render_frames(clip, fps, tail):
+            if errors:
+                break
+            frames.put(frame)
+            count += 1
+    finally:
+        frames.put(None)
+        thread.join()
+    if errors:
+        raise IOError(f"Writing frames failed: {errors[0]}")
+    return count
+
+def bot_clip(seed, bird_type='blue', max_ticks=tournament.default_max_steps):
+    """ A live run played by the gap follower, recorded as a replay to render """
+    sim = simulation.Simulation(bird_type, seed)
+    clip = replay.Replay(bird_type, seed)
+    state = sim.get_state()
+    while not state['done'] and state['tick'] < max_ticks:
+        flap = tournament.gap_follower_policy(sim)
+        clip.record(flap)
+        state = sim.step(flap)
+    clip.finish(state)
+    return clip
+
+def open_writer(output_format, output, name):
+    if output == '-':
+        # The real stdout: while exporting, sys.stdout is redirected to stderr
+        return RawWriter(sys.__stdout__.buffer, close_stream=False)
+    if output_format == 'raw':
+        os.makedirs(output, exist_ok=True)
+        return RawWriter(open(os.path.join(output, f'{name}.rgb'), 'wb'))
+    directory = os.path.join(output, name)
+    return PngWriter(directory) if output_format == 'png' else NpyWriter(directory)
+
+def _export_jobs(jobs, output_format, output, fps):
+    # One worker process: (name, replay path or bot seed, bird type) -> (name, frames or error)
+    results = []
+    for name, source, bird_type in jobs:
+        try:
+            clip = replay.Replay.load(source) if isinstance(source, str) else bot_clip(source, bird_type)
+            results.append((name, export_clip(clip, open_writer(output_format, output, name), fps)))
+        except (IOError, ValueError, replay.ReplayError) as e:
+            results.append((name, f"{e}"))
+    return results
+
+def export_all(jobs, output_format, output, fps, workers=1, chunk_size=8):
+    """ Render every job, spread over worker processes; yields (name, frames or error) """
+    if workers <= 1:
+        yield from _export_jobs(jobs, output_format, output, fps)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results in pool.map(_export_jobs, chunks, *zip(*[(output_format, output, fps)] * len(chunks))):
+            yield from results
+
+def main():
+    parser = argparse.ArgumentParser(description='Render replays to video frames without a display')
+    parser.add_argument('paths', nargs='*', help='replay files or directories of replays')
+    parser.add_argument('--bot', type=int, nargs='+', metavar='SEED', help='also render runs played by the gap follower')
+    parser.add_argument('--bird', default='blue', help='bird type for --bot runs')
+    parser.add_argument('--format', choices=('raw', 'png', 'npy'), default='raw')
+    parser.add_argument('--output', default='clips',
+                        help="output directory, or '-' to stream raw RGB of a single clip to stdout")
+    parser.add_argument('--fps', type=int, default=frame_rate, help='frames per second of game time')
+    parser.add_argument('--workers', type=int, default=1, help='processes rendering clips in parallel')
+    args = parser.parse_args()
+
+    jobs = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            jobs.extend((os.path.splitext(name)[0], os.path.join(path, name), None) for name in names)
+        else:
+            jobs.append((os.path.splitext(os.path.basename(path))[0], path, None))
+    jobs.extend((f'bot_{args.bird}_{seed}', seed, args.bird) for seed in args.bot or [])
+    if not jobs:
+        parser.error('nothing to render: give replay paths or --bot seeds')
+    if args.output == '-' and (len(jobs) > 1 or args.format != 'raw'):
+        parser.error("--output - streams one clip as raw RGB")
+
+    # Game assets are relative to the repository; paths given are not
+    jobs = [(name, os.path.abspath(source) if isinstance(source, str) else source, bird_type)
+            for name, source, bird_type in jobs]
+    output = args.output if args.output == '-' else os.path.abspath(args.output)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    start = time.perf_counter()
+    total_frames = 0
+    failures = 0
+    # stdout may be carrying the frames, so messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        for name, result in export_all(jobs, args.format, output, args.fps, args.workers):
+            if isinstance(result, str):
+                failures += 1
+                print(f"Error rendering {name}: {result}")
+            else:
+                total_frames += result
+                print(f"{name}: {result} frames")
+        elapsed = time.perf_counter() - start
+        print(f"{len(jobs) - failures}/{len(jobs)} clips, {total_frames} frames of {screen_width}x{screen_height} RGB "
+              f"at {args.fps} fps in {elapsed:.1f}s ({total_frames / elapsed:.0f} frames/s)")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
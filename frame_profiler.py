@@ -0,0 +1,75 @@
+import csv
+import json
+import time
+from collections import deque
+
+class FrameProfiler:
+    """ Splits each frame into named sections with lap(name): the time since the
+    previous lap is charged to that section, summed over the frame, and kept in
+    a rolling window of recent frames for percentile stats. Callers keep a None
+    profiler when profiling is off, so the disabled cost is one test per lap. """
+
+    def __init__(self, window=600):
+        self.window = window
+        self.sections = {}   # name -> deque of per-frame milliseconds
+        self.frame_times = deque(maxlen=window)
+        self.current = {}
+        self.frames = 0
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def begin_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.current.clear()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        self.frames += 1
+        self.frame_times.append((self.last_mark - self.frame_start) * 1000)
+        for name, elapsed in self.current.items():
+            samples = self.sections.get(name)
+            if samples is None:
+                samples = self.sections[name] = deque(maxlen=self.window)
+            samples.append(elapsed)
+        # Sections that did not run this frame (menus, no physics tick) record zero
+        for name, samples in self.sections.items():
+            if name not in self.current:
+                samples.append(0.0)
+
+    def stats(self, samples):
+        if not samples:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'max': 0.0, 'samples': 0}
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {
+            'p50': ordered[round(last * 0.50)],
+            'p95': ordered[round(last * 0.95)],
+            'p99': ordered[round(last * 0.99)],
+            'mean': sum(ordered) / len(ordered),
+            'max': ordered[-1],
+            'samples': len(ordered),
+        }
+
+    def summary(self):
+        return {
+            'frames': self.frames,
+            'frame': self.stats(self.frame_times),
+            'sections': {name: self.stats(samples) for name, samples in self.sections.items()},
+        }
+
+    def dump(self, path):
+        """ Write the summary as CSV when path ends in .csv, JSON otherwise """
+        summary = self.summary()
+        with open(path, 'w', newline='') as f:
+            if path.lower().endswith('.csv'):
+                writer = csv.writer(f)
+                writer.writerow(['section', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'max_ms', 'samples'])
+                rows = [('frame', summary['frame'])] + list(summary['sections'].items())
+                for name, stats in rows:
+                    writer.writerow([name] + [round(stats[key], 4) for key in ('p50', 'p95', 'p99', 'mean', 'max')]
+                                    + [stats['samples']])
+            else:
+                json.dump(summary, f, indent=2)
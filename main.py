@@ -1,41 +1,17 @@
 import pygame
 import sys
-import random
-import os
+from functools import cached_property
 from bird_manager import BirdManager
+from save_store import SaveStore
+from asset_manager import AssetManager, AssetBundle, resource_path
+from text_cache import TextCache
+from frame_profiler import FrameProfiler
+import simulation
+import replay
+from simulation import screen_width, screen_height, frame_rate
 
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and for PyInstaller """
-    try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init() # Initialize the mixer for sounds
-
-# Screen dimensions
-screen_width = 288
-screen_height = 512
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption('Flappy Bird')
-
-# Game clock
-clock = pygame.time.Clock()
-
-# Game Difficulty Settings
-pipe_move_speed = 2         # Reduced from 3 to 2 for better pacing
-pipe_spawn_interval = 1800  # Increased from 1500 to 1800 for more spacing
-pipe_gap_size = 150         # Keep the same gap size
-
-# High Score File
-high_score_file = "highscore.txt"
-
-# Initialize bird manager
-bird_manager = BirdManager()
+# Replay of the most recent run (seed plus per-tick flap inputs)
+last_replay_file = "last_run.replay"
 
 # Game state
 game_state = 'start_screen'  # 'start_screen', 'bird_select', 'game_active', 'game_over'
@@ -49,321 +25,252 @@ pipes_passed_count = 0 # Track pipes passed for difficulty
 UI_PADDING = 20
 UI_SPACING = 30
 
-# Font setup
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 24)
+# Rendered text surfaces are reused instead of re-rendered every frame
+text_cache = TextCache()
+
+# Base (ground strip) height on screen
+base_y = screen_height - 112  # Adjust this value based on your base image height
 
-# Background scroll speed (keep global as it's a constant)
+# Background scroll speed in pixels per physics tick (keep global as it's a constant)
 background_scroll_speed = 0.5
 
-# Timer for spawning pipes (defined globally)
-PIPE_SPAWN_EVENT = pygame.USEREVENT # Define PIPE_SPAWN_EVENT globally
-
-# Function to load high score
-def load_high_score():
-    try:
-        with open(high_score_file, 'r') as f:
-            score_val = int(f.read())
-            return score_val
-    except (IOError, ValueError):
-        return 0
-
-# Function to save high score
-def save_high_score(score_val):
-    try:
-        with open(high_score_file, 'w') as f:
-            f.write(str(score_val))
-    except IOError:
-        print("Error saving high score")
-
-# Load high score
-high_score = load_high_score()
-
-# Load Sounds
-try:
-    sound_flap = pygame.mixer.Sound(resource_path('assets/audio/wing.ogg'))
-    sound_point = pygame.mixer.Sound(resource_path('assets/audio/point.ogg'))
-    sound_hit = pygame.mixer.Sound(resource_path('assets/audio/hit.ogg'))
-    sound_die = pygame.mixer.Sound(resource_path('assets/audio/die.ogg'))
-    sound_swoosh = pygame.mixer.Sound(resource_path('assets/audio/swoosh.ogg'))
-except pygame.error as e:
-    print(f"Error loading sound(s): {e}. Sound effects will be disabled.")
-    class DummySound:
-        def play(self):
-            pass
-    sound_flap = DummySound()
-    sound_point = DummySound()
-    sound_hit = DummySound()
-    sound_die = DummySound()
-    sound_swoosh = DummySound()
-
-# Load Background Music
-try:
-    pygame.mixer.music.load(resource_path('assets/audio/background.mp3'))
-    pygame.mixer.music.set_volume(0.5) # Adjust volume as needed (0.0 to 1.0)
-except pygame.error as e:
-    print(f"Error loading background music: {e}. Background music will not play.")
-
-# Load images (assuming they are in an 'assets' folder)
-# For now, we'll use placeholder colors if images are not found
-try:
-    bird_image_mid = pygame.image.load(resource_path('assets/sprites/yellowbird-midflap.png')).convert_alpha()
-    bird_image_up = pygame.image.load(resource_path('assets/sprites/yellowbird-upflap.png')).convert_alpha()
-    bird_image_down = pygame.image.load(resource_path('assets/sprites/yellowbird-downflap.png')).convert_alpha()
-    bird_frames = [bird_image_down, bird_image_mid, bird_image_up]
-except pygame.error as e:
-    print(f"Error loading bird animation frames: {e}. Trying single bird.png or placeholder.")
-    try:
-        bird_image = pygame.image.load(resource_path('assets/sprites/yellowbird-midflap.png')).convert_alpha()
-        bird_frames = [bird_image, bird_image, bird_image]
-    except pygame.error as e2:
-        print(f"Error loading bird.png: {e2}. Using a placeholder rectangle.")
-        bird_frames = None
-
-try:
-    pipe_image = pygame.image.load(resource_path('assets/sprites/pipe-green.png')).convert_alpha()
-except pygame.error as e:
-    print(f"Error loading pipe image: {e}. Using a placeholder.")
-    pipe_image = None
-
-try:
-    background_image = pygame.image.load(resource_path('assets/sprites/background-day.png')).convert()
-    background_image = pygame.transform.scale(background_image, (screen_width, screen_height))
-except pygame.error as e:
-    print(f"Error loading background image: {e}. Using default sky color.")
-    background_image = None
-
-try:
-    message_image = pygame.image.load(resource_path('assets/sprites/message.png')).convert_alpha()
-except pygame.error as e:
-    print(f"Error loading message.png: {e}. Start screen message image will not be shown.")
-    message_image = None
-
-try:
-    game_over_image = pygame.image.load(resource_path('assets/sprites/gameover.png')).convert_alpha()
-except pygame.error as e:
-    print(f"Error loading gameover.png: {e}. Game over image will not be shown.")
-    game_over_image = None
-
-# Load coin image (sprite sheet)
-try:
-    # Assuming coin animation frames are 20x20 pixels and laid out horizontally (updated)
-    coin_sprite_sheet = pygame.image.load(resource_path('assets/sprites/Coin_One.png')).convert_alpha()
-    coin_frame_width = 20 # Assumed frame width (changed back to 20)
-    coin_frame_height = 20 # Assumed frame height (changed back to 20)
-    # Calculate the number of frames based on sprite sheet width
-    num_coin_frames = coin_sprite_sheet.get_rect().width // coin_frame_width
-    # Extract frames
-    coin_frames = []
-    for i in range(num_coin_frames):
-        frame = coin_sprite_sheet.subsurface((i * coin_frame_width, 0, coin_frame_width, coin_frame_height))
-        coin_frames.append(frame)
-
-except pygame.error as e:
-    print(f"Error loading coin sprite sheet: {e}. Using a placeholder.")
-    coin_sprite_sheet = None
-    coin_frames = None # Use None to indicate no animation frames loaded
-    coin_frame_width = 20 # Match placeholder size
-    coin_frame_height = 20 # Match placeholder size
-
-except FileNotFoundError:
-    print("Coin_One.png not found. Using a placeholder.")
-    coin_sprite_sheet = None
-    coin_frames = None
-    coin_frame_width = 20 # Match placeholder size
-    coin_frame_height = 20 # Match placeholder size
-
-# Load power-up countdown sprites
-try:
-    countdown_1 = pygame.image.load(resource_path('assets/sprites/1.png')).convert_alpha()
-    countdown_2 = pygame.image.load(resource_path('assets/sprites/2.png')).convert_alpha()
-    countdown_3 = pygame.image.load(resource_path('assets/sprites/3.png')).convert_alpha()
-    countdown_sprites = [countdown_3, countdown_2, countdown_1]  # Order matters for countdown
-except pygame.error as e:
-    print(f"Error loading countdown sprites: {e}. Countdown will not be shown.")
-    countdown_sprites = None
-
-# Load base image
-try:
-    base_image = pygame.image.load(resource_path('assets/sprites/base.png')).convert_alpha()
-except pygame.error as e:
-    print(f"Error loading base image: {e}. Using a placeholder.")
-    base_image = None
+# Coin animation frames are 20x20 pixels laid out horizontally
+coin_frame_width = 20
+coin_frame_height = 20
+
+class DummySound:
+    def play(self):
+        pass
+
+class GameSounds:
+    """ Sound effects and background music; initializes the mixer """
+
+    def __init__(self, asset_manager):
+        pygame.mixer.init() # Initialize the mixer for sounds
+
+        # Load Sounds
+        try:
+            self.flap = asset_manager.sound('assets/audio/wing.ogg')
+            self.point = asset_manager.sound('assets/audio/point.ogg')
+            self.hit = asset_manager.sound('assets/audio/hit.ogg')
+            self.die = asset_manager.sound('assets/audio/die.ogg')
+            self.swoosh = asset_manager.sound('assets/audio/swoosh.ogg')
+        except pygame.error as e:
+            print(f"Error loading sound(s): {e}. Sound effects will be disabled.")
+            self.flap = DummySound()
+            self.point = DummySound()
+            self.hit = DummySound()
+            self.die = DummySound()
+            self.swoosh = DummySound()
+
+        # Load Background Music
+        try:
+            pygame.mixer.music.load(resource_path('assets/audio/background.mp3'))
+            pygame.mixer.music.set_volume(0.5) # Adjust volume as needed (0.0 to 1.0)
+        except pygame.error as e:
+            print(f"Error loading background music: {e}. Background music will not play.")
+
+class GameImages:
+    """ Every sprite the game draws; None where an image failed to load """
+
+    def __init__(self, asset_manager):
+        try:
+            self.pipe = asset_manager.image('assets/sprites/pipe-green.png')
+        except pygame.error as e:
+            print(f"Error loading pipe image: {e}. Using a placeholder.")
+            self.pipe = None
+
+        try:
+            self.background = asset_manager.scaled('assets/sprites/background-day.png', (screen_width, screen_height), alpha=False)
+        except pygame.error as e:
+            print(f"Error loading background image: {e}. Using default sky color.")
+            self.background = None
+
+        try:
+            self.message = asset_manager.image('assets/sprites/message.png')
+        except pygame.error as e:
+            print(f"Error loading message.png: {e}. Start screen message image will not be shown.")
+            self.message = None
+
+        try:
+            self.game_over = asset_manager.image('assets/sprites/gameover.png')
+        except pygame.error as e:
+            print(f"Error loading gameover.png: {e}. Game over image will not be shown.")
+            self.game_over = None
+
+        # Coin animation frames, cut from the sprite sheet once
+        try:
+            self.coin_frames = asset_manager.frames('assets/sprites/Coin_One.png', coin_frame_width, coin_frame_height)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading coin sprite sheet: {e}. Using a placeholder.")
+            self.coin_frames = None # Use None to indicate no animation frames loaded
+
+        # Load power-up countdown sprites
+        try:
+            countdown_1 = asset_manager.image('assets/sprites/1.png')
+            countdown_2 = asset_manager.image('assets/sprites/2.png')
+            countdown_3 = asset_manager.image('assets/sprites/3.png')
+            self.countdown = [countdown_3, countdown_2, countdown_1]  # Order matters for countdown
+        except pygame.error as e:
+            print(f"Error loading countdown sprites: {e}. Countdown will not be shown.")
+            self.countdown = None
+
+        # Load score digit sprites
+        try:
+            self.digits = [asset_manager.image(f'assets/sprites/{digit}.png') for digit in range(10)]
+        except pygame.error as e:
+            print(f"Error loading digit sprites: {e}. Score will be drawn with the font.")
+            self.digits = None
+
+        try:
+            self.base = asset_manager.image('assets/sprites/base.png')
+        except pygame.error as e:
+            print(f"Error loading base image: {e}. Using a placeholder.")
+            self.base = None
+
+class App:
+    """ Owns pygame and everything loaded from disk. Nothing starts at import
+    time; each subsystem (display, audio, assets, fonts, saved progress) is
+    brought up the first time something asks for it. """
+
+    @cached_property
+    def screen(self):
+        pygame.display.init()
+        screen = pygame.display.set_mode((screen_width, screen_height))
+        pygame.display.set_caption('Flappy Bird')
+        return screen
+
+    @cached_property
+    def clock(self):
+        return pygame.time.Clock()
+
+    @cached_property
+    def asset_manager(self):
+        # Images are converted for the display, so it has to exist first.
+        # Loads from the packed bundle when build_bundle.py has produced one.
+        self.screen
+        return AssetManager(AssetBundle.open_if_present(resource_path('assets.bundle')))
+
+    @cached_property
+    def images(self):
+        return GameImages(self.asset_manager)
+
+    @cached_property
+    def sounds(self):
+        return GameSounds(self.asset_manager)
+
+    @cached_property
+    def font(self):
+        pygame.font.init()
+        return pygame.font.Font(None, 36)
+
+    @cached_property
+    def small_font(self):
+        pygame.font.init()
+        return pygame.font.Font(None, 24)
+
+    @cached_property
+    def save_store(self):
+        # High score and bird progress; written by a background thread
+        return SaveStore()
+
+    @cached_property
+    def bird_manager(self):
+        return BirdManager(self.save_store)
+
+    @cached_property
+    def run_history(self):
+        # Every finished run, stored and queried on its own thread; sqlite3 is
+        # only imported once the first run needs it
+        from run_history import RunHistory
+        return RunHistory()
+
+    def shutdown(self):
+        # Let queued saves and runs reach the disk; skips what was never started
+        if 'save_store' in self.__dict__:
+            self.save_store.flush()
+        if 'run_history' in self.__dict__:
+            self.run_history.close()
+
+    def preload(self):
+        # Bring everything up front so the first frame does not stall
+        self.images
+        self.sounds
+        self.font
+        self.small_font
+        self.bird_manager
+
+app = App()
 
 # Bird class
-class Bird(pygame.sprite.Sprite):
+class Bird(simulation.Bird, pygame.sprite.DirtySprite):
     def __init__(self, bird_type='default'):
-        super().__init__()
-        self.bird_type = bird_type
+        super().__init__(bird_type)
+        self.dirty = 2  # Moves every frame
         self.frames = self._load_bird_frames()
-        self.frame_index = 0
-        self.animation_speed = 0.15
-        self.animation_timer = 0
 
         if self.frames:
             self.image = self.frames[self.frame_index]
         else:
             self.image = pygame.Surface([34, 24])
             self.image.fill((255, 255, 0))
-            self.frames = [self.image, self.image, self.image]
-        
-        self.rect = self.image.get_rect(center=(50, screen_height // 2))
-        self.velocity = 0
-        self.gravity = 0.25
-        self.flap_strength = -6
-        self.horizontal_speed = 0
+            self.frames = [self.image] * self.frame_count
 
-        self._apply_bird_type_attributes()
+        self.rect = self.image.get_rect(center=self.rect.center)
 
     def _load_bird_frames(self):
         try:
-            if self.bird_type == 'red':
-                return [
-                    pygame.image.load(resource_path('assets/sprites/redbird-downflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/redbird-midflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/redbird-upflap.png')).convert_alpha()
-                ]
-            elif self.bird_type == 'yellow':
-                return [
-                    pygame.image.load(resource_path('assets/sprites/yellowbird-downflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/yellowbird-midflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/yellowbird-upflap.png')).convert_alpha()
-                ]
-            elif self.bird_type == 'blue':
-                return [
-                    pygame.image.load(resource_path('assets/sprites/bluebird-downflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/bluebird-midflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/bluebird-upflap.png')).convert_alpha()
-                ]
-            else:  # default bird (will be removed later)
-                 return [
-                    pygame.image.load(resource_path('assets/sprites/bluebird-downflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/bluebird-midflap.png')).convert_alpha(),
-                    pygame.image.load(resource_path('assets/sprites/bluebird-upflap.png')).convert_alpha()
-                ]
+            return [app.asset_manager.image(path) for path in simulation.bird_frame_paths(self.bird_type)]
         except pygame.error as e:
             print(f"Error loading bird frames: {e}")
             return None
 
-    def _apply_bird_type_attributes(self):
-        if self.bird_type == 'red':
-            self.horizontal_speed = 0.8
-            self.gravity = 0.25
-            self.flap_strength = -6
-        elif self.bird_type == 'yellow':
-            self.horizontal_speed = 0
-            self.gravity = 0.35
-            self.flap_strength = -8
-        elif self.bird_type == 'blue':
-            self.horizontal_speed = 0
-            self.gravity = 0.25
-            self.flap_strength = -6
-
-    def update(self):
-        if self.frames and len(self.frames) > 1:
-            self.animation_timer += self.animation_speed
-            if self.animation_timer >= 1:
-                self.frame_index = (self.frame_index + 1) % len(self.frames)
-                self.image = self.frames[self.frame_index]
-                self.animation_timer = 0
-        
-        self.velocity += self.gravity
-        self.rect.y += int(self.velocity)
-        
-        if self.rect.x < 50:
-            self.rect.x += 1
-        elif self.horizontal_speed != 0:
-            self.rect.x += int(self.horizontal_speed)
-
-        if self.rect.top < 0:
-            self.rect.top = 0
-            self.velocity = 0
-
-    def flap(self, game_instance):
-        if game_instance.game_state == 'game_active':
-            self.velocity = self.flap_strength
-            sound_flap.play()
+    def update(self, legacy_physics=False):
+        # The simulation advances the wing animation
+        super().update(legacy_physics)
+        self.image = self.frames[self.frame_index]
 
     def draw(self, surface):
         surface.blit(self.image, self.rect)
 
 # Pipe class
-class Pipe(pygame.sprite.Sprite):
-    def __init__(self, x, y, position, current_horizontal_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=False):
-        super().__init__()
-        self.image = pipe_image
-        self.pipe_type = position
-        pipe_width = 52
-        pipe_height = 320
+class Pipe(simulation.Pipe, pygame.sprite.DirtySprite):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = 2
+
+    def reset(self, *args, **kwargs):
+        # Also runs when the pool hands out a recycled pipe
+        super().reset(*args, **kwargs)
+        self.image = app.images.pipe
 
         if self.image is None:
-            self.image = pygame.Surface([pipe_width, pipe_height])
+            self.image = pygame.Surface([self.width, self.height])
             self.image.fill((0, 255, 0))
-        else:
-            pipe_width = self.image.get_width()
-            pipe_height = self.image.get_height()
-
-        self.passed = False
-        self.rect = self.image.get_rect()
-
-        # Store initial position for horizontal range calculation
-        self.initial_x = x
-        self.is_horizontal_mover = is_horizontal_mover
-        self.horizontal_speed = horizontal_speed
-        self.horizontal_range = horizontal_range
-        self.moving_forward = random.choice([True, False]) # Start moving forward or backward randomly
-
-        if position == 1:
-            if inverted:
-                 self.image = pygame.transform.flip(self.image, False, True)
-            self.rect.bottomleft = (x, y - pipe_gap_size // 2)
-        elif position == -1:
-            if not inverted:
-                pass
-            self.rect.topleft = (x, y + pipe_gap_size // 2)
-
-        # Store the current horizontal speed (used for reference, not updated here)
-        self.current_horizontal_speed = current_horizontal_speed
-
-    def update(self, current_horizontal_speed):
-        # Update base horizontal position
-        self.rect.x -= current_horizontal_speed
-
-        # Update additional horizontal movement if it's a horizontal mover
-        if self.is_horizontal_mover and self.horizontal_range > 0:
-            if self.moving_forward:
-                self.rect.x += self.horizontal_speed
-                # Check if reached forward limit of range
-                if self.rect.x >= self.initial_x + self.horizontal_range:
-                    self.moving_forward = False
-            else:
-                self.rect.x -= self.horizontal_speed
-                # Check if reached backward limit of range
-                if self.rect.x <= self.initial_x - self.horizontal_range:
-                    self.moving_forward = True
-
-        if self.rect.right < 0:
-            self.kill()
+        elif self.pipe_type == 1 and self.inverted:
+            # Flipped once by the asset manager and shared by every top pipe
+            self.image = app.asset_manager.flipped('assets/sprites/pipe-green.png', False, True)
 
 # Coin class
-class Coin(pygame.sprite.Sprite):
+class Coin(simulation.Coin, pygame.sprite.DirtySprite):
     def __init__(self, x, y):
-        super().__init__()
-        
-        self.frames = coin_frames
+        super().__init__(x, y)
+        self.dirty = 2
+
+    def reset(self, x, y):
+        super().reset(x, y)
+        self.frames = app.images.coin_frames
         self.frame_index = 0
         self.animation_speed = 0.2
         self.animation_timer = 0
 
         if self.frames:
             self.image = self.frames[self.frame_index]
-            self.rect = self.image.get_rect(center=(x, y))
         else:
             self.image = pygame.Surface([coin_frame_width, coin_frame_height])
             self.image.fill((255, 223, 0))
-            self.rect = self.image.get_rect(center=(x, y))
 
-    def update(self, current_horizontal_speed):
+    def update(self, current_horizontal_speed, legacy_physics=False):
         # Animate coin
         if self.frames and len(self.frames) > 1:
             self.animation_timer += self.animation_speed
@@ -372,66 +279,358 @@ class Coin(pygame.sprite.Sprite):
                 self.image = self.frames[self.frame_index]
                 self.animation_timer = 0
 
-        # Move coin to the left using current_horizontal_speed
-        self.rect.x -= current_horizontal_speed
-        if self.rect.right < 0:
-            self.kill()
+        super().update(current_horizontal_speed, legacy_physics)
+
+# Other racers' birds, drawn see-through; one copy per bird frame
+ghost_alpha = 110
+_ghost_images = {}
+
+def ghost_image(image):
+    ghost = _ghost_images.get(image)
+    if ghost is None:
+        ghost = _ghost_images[image] = image.copy()
+        ghost.set_alpha(ghost_alpha)
+    return ghost
+
+# In-game score, built from the digit sprites and cached per value
+def render_score(value):
+    text = str(value)
+    digit_images = app.images.digits
+    if not digit_images:
+        return text_cache.render(app.font, text, (255, 255, 255))
+
+    def compose():
+        digits = [digit_images[int(char)] for char in text]
+        surface = pygame.Surface((sum(d.get_width() for d in digits), max(d.get_height() for d in digits)), pygame.SRCALPHA)
+        x = 0
+        for digit in digits:
+            surface.blit(digit, (x, 0))
+            x += digit.get_width()
+        return surface
+    return text_cache.get(('score', text), compose)
+
+# Draw background, simulation sprites and base onto any surface
+def draw_playfield(surface, sim, background_x=0, base_x=0, show_sprites=True, alpha=None):
+    background_image = app.images.background
+    base_image = app.images.base
+    if background_image:
+        surface.blit(background_image, (background_x, 0))
+        surface.blit(background_image, (background_x + screen_width, 0))
+    else:
+        surface.fill((135, 206, 235))
+
+    if show_sprites:
+        if alpha is None:
+            sim.all_sprites.draw(surface)
+        else:
+            # Between physics ticks: every sprite part way from where it was a tick ago
+            for sprite in sim.all_sprites:
+                surface.blit(sprite.image, (round(sprite.prev_x + (sprite.x - sprite.prev_x) * alpha),
+                                            round(sprite.prev_y + (sprite.y - sprite.prev_y) * alpha)))
+
+    if base_image:
+        surface.blit(base_image, (base_x, base_y))
+        surface.blit(base_image, (base_x + screen_width, base_y))
+
+# A line of HUD text, re-rendered only when its text changes
+class TextSprite(pygame.sprite.DirtySprite):
+    def __init__(self, text_font, color, text='', **position):
+        super().__init__()
+        self.font = text_font
+        self.color = color
+        self.position = position
+        self.text = None
+        self.set_text(text)
+
+    def render(self, text):
+        return text_cache.render(self.font, text, self.color)
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.image = self.render(text)
+            self.rect = self.image.get_rect(**self.position)
+            self.dirty = 1
+
+# The in-game score drawn with digit sprites
+class ScoreSprite(TextSprite):
+    def render(self, text):
+        return render_score(int(text))
+
+# The scrolling base, pre-composited into one strip wide enough to wrap around
+class BaseStrip(pygame.sprite.DirtySprite):
+    def __init__(self):
+        super().__init__()
+        base_image = app.images.base
+        self.image = pygame.Surface((screen_width + base_image.get_width(), base_image.get_height())).convert()
+        self.image.blit(base_image, (0, 0))
+        self.image.blit(base_image, (screen_width, 0))
+        self.rect = self.image.get_rect(topleft=(0, base_y))
+        self.dirty = 2
+
+    def scroll_to(self, base_x):
+        self.rect.x = base_x
+
+# In-game renderer that only repaints what moved (bird, pipes, coins, base, HUD)
+# over a pre-composited static background. The background does not scroll in
+# this mode, since scrolling it would dirty the whole screen every frame.
+class DirtyRenderer:
+    def __init__(self):
+        background_image = app.images.background # Also brings up the display
+        self.background = pygame.Surface((screen_width, screen_height)).convert()
+        if background_image:
+            self.background.blit(background_image, (0, 0))
+        else:
+            self.background.fill((135, 206, 235))
+
+        self.group = pygame.sprite.LayeredDirty()
+        self.group.set_timing_threshold(1000 / frame_rate)
+        self.base_strip = BaseStrip() if app.images.base else None
+        self.score_text = ScoreSprite(app.font, (255, 255, 255), '0', center=(screen_width // 2, UI_PADDING + 20))
+        self.coin_text = TextSprite(app.small_font, (255, 255, 0), topleft=(UI_PADDING, UI_PADDING))
+        self.bird = None
+        self.full_repaint = True
+
+    def invalidate(self):
+        # Next frame repaints the whole screen (after menus drew over it)
+        self.full_repaint = True
+
+    def draw(self, surface, game):
+        sim = game.sim
+        if sim.bird is not self.bird:
+            # New game: drop the previous run's sprites
+            self.bird = sim.bird
+            self.group.empty()
+            if self.base_strip:
+                self.group.add(self.base_strip, layer=1)
+            self.group.add(self.score_text, self.coin_text, layer=2)
+            self.full_repaint = True
+
+        # Picks up newly spawned pipes and coins; killed sprites leave on their own
+        self.group.add(*sim.all_sprites, layer=0)
+        if self.base_strip:
+            self.base_strip.scroll_to(game.base_x)
+        self.score_text.set_text(str(int(sim.score)))
+        self.coin_text.set_text(f'Coins: {sim.coin_count}')
+
+        if self.full_repaint:
+            surface.blit(self.background, (0, 0))
+            self.group.repaint_rect(surface.get_rect())
+        rects = self.group.draw(surface, self.background)
+        if self.full_repaint:
+            self.full_repaint = False
+            return [surface.get_rect()]
+        return rects
+
+# Bird select menu: a dimming shade and a layer of boxes and labels, composed
+# once and rebuilt only when the selection or the unlocked birds change. Only
+# the parts of the layer holding something are blitted over the scrolling
+# background. The preview bird cycles through the shared wing frames.
+class BirdSelectMenu:
+    box_top = UI_PADDING + 80
+    box_height = 60
+    box_spacing = 10
+
+    def __init__(self, bird_manager):
+        self.bird_manager = bird_manager
+        self.shade = None
+        self.layer = None
+        self.regions = []  # Non-overlapping rects of the layer that hold boxes or labels
+        self.key = None
+        self.preview_type = None
+        self.preview_frames = None
+        self.frame_index = 0
+        self.animation_timer = 0
+
+    def box_rect(self, i):
+        center_y = self.box_top + i * (self.box_height + self.box_spacing)
+        return pygame.Rect(UI_PADDING, center_y - self.box_height // 2, screen_width - UI_PADDING * 2, self.box_height)
+
+    def bird_at(self, position):
+        """ Unlocked bird whose box contains position, or None """
+        for i, bird_type in enumerate(self.bird_manager.get_available_birds()):
+            box_rect = self.box_rect(i)
+            if box_rect.top <= position[1] <= box_rect.bottom and self.bird_manager.is_bird_unlocked(bird_type):
+                return bird_type
+        return None
+
+    def build(self, selected_bird_type):
+        font = app.font
+        small_font = app.small_font
+        self.layer = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
+        self.regions = []
+
+        def blit_centered(text_font, text, color, center_y):
+            text_surface = text_cache.render(text_font, text, color)
+            return self.layer.blit(text_surface, text_surface.get_rect(center=(screen_width // 2, center_y)))
+
+        self.regions.append(blit_centered(font, 'Select Bird', (255, 255, 0), UI_PADDING + 20))
+        for i, bird_type in enumerate(self.bird_manager.get_available_birds()):
+            # Labels sit inside their box, so the box covers them
+            box_rect = self.box_rect(i)
+            self.regions.append(box_rect)
+            if bird_type == selected_bird_type:
+                pygame.draw.rect(self.layer, (255, 255, 0), box_rect, 2)
+            else:
+                pygame.draw.rect(self.layer, (255, 255, 255), box_rect, 1)
+
+            achievement = self.bird_manager.get_bird_achievement_info(bird_type)
+            if self.bird_manager.is_bird_unlocked(bird_type):
+                bird_text = f"{bird_type.capitalize()} Bird"
+                if bird_type == selected_bird_type:
+                    bird_text += " ✓"
+                blit_centered(small_font, bird_text, (255, 255, 255), box_rect.centery - 10)
+                if achievement and 'description' in achievement:
+                    blit_centered(small_font, achievement['description'], (180, 180, 180), box_rect.centery + 10)
+            elif achievement:
+                blit_centered(small_font, f"Locked: {achievement['description']}", (128, 128, 128), box_rect.centery - 10)
+
+        self.regions.append(blit_centered(small_font, '↑↓ to select, Space to choose', (200, 200, 200), screen_height - UI_PADDING - 30))
+        self.regions.append(blit_centered(small_font, 'Click to Play', (255, 255, 255), screen_height - UI_PADDING))
+
+    def draw(self, surface, selected_bird_type):
+        key = (selected_bird_type, frozenset(self.bird_manager.unlocked_birds))
+        if key != self.key:
+            self.key = key
+            self.build(selected_bird_type)
+        if self.shade is None:
+            self.shade = pygame.Surface((screen_width, screen_height)).convert()
+            self.shade.set_alpha(128)
+        surface.blit(self.shade, (0, 0))
+        for region in self.regions:
+            surface.blit(self.layer, region, region)
+
+        if selected_bird_type != self.preview_type:
+            self.preview_type = selected_bird_type
+            self.preview_frames = Bird(selected_bird_type).frames
+            self.frame_index = 0
+            self.animation_timer = 0
+        self.animation_timer += Bird.animation_speed
+        if self.animation_timer >= 1:
+            self.frame_index = (self.frame_index + 1) % len(self.preview_frames)
+            self.animation_timer = 0
+        frame = self.preview_frames[self.frame_index]
+        surface.blit(frame, frame.get_rect(center=(screen_width // 2, screen_height - 100)))
+
+# Frame timing panel (F3), rebuilt from the profiler's rolling stats a couple
+# of times a second. Opaque, so redrawing it over itself needs no clearing.
+class ProfilerOverlay:
+    refresh_frames = 30
 
-# --- Game Class Refactor with Difficulty Modifier, Vertical Pipes, and PowerUps ---
-class Game:
     def __init__(self):
+        pygame.font.init()
+        self.font = pygame.font.Font(None, 16)
+        self.surface = None
+        self.built_at = 0
+
+    def build(self, profiler):
+        summary = profiler.summary()
+        rows = [('ms', 'p50', 'p95', 'p99')]
+        for name, stats in [('frame', summary['frame'])] + list(summary['sections'].items()):
+            rows.append((name, *(f"{stats[key]:.2f}" for key in ('p50', 'p95', 'p99'))))
+        columns = [0, 86, 126, 166]
+        line_height = self.font.get_linesize()
+        self.surface = pygame.Surface((206, line_height * len(rows) + 8)).convert()
+        self.surface.fill((20, 20, 20))
+        for i, row in enumerate(rows):
+            color = (255, 255, 0) if i == 0 else (230, 230, 230)
+            for x, text in zip(columns, row):
+                self.surface.blit(self.font.render(text, True, color), (x + 6, i * line_height + 4))
+        self.built_at = profiler.frames
+
+    def draw(self, surface, profiler):
+        if self.surface is None or profiler.frames - self.built_at >= self.refresh_frames:
+            self.build(profiler)
+        return surface.blit(self.surface, (screen_width - self.surface.get_width() - 4, 4))
+
+# Simulation that spawns the image-carrying sprites above
+class GameSimulation(simulation.Simulation):
+    bird_class = Bird
+    pipe_class = Pipe
+    coin_class = Coin
+
+# --- Game Class: input, audio and rendering over the headless simulation ---
+class Game:
+    def __init__(self, playback=None, dirty_rendering=False, mask_collision=False, show_profiler=False, profile_path=None,
+                 course=None, render_fps=frame_rate, race_connection=None, state_publisher=None):
         # Game state variables
         self.game_state = 'start_screen'
         self.selected_bird_type = 'blue'
-        self.score = 0
         self.high_score = self.load_high_score()
-        self.coin_count = 0
-        self.pipes_passed_count = 0
-        self.pipe_move_speed = 2.0
-        self.pipe_spawn_interval = 1800
-        self.difficulty_stage = 0
-        self.base_horizontal_pipe_speed = 1.0
-        self.horizontal_pipe_speed_increase = 0.2
-        self.base_pipe_horizontal_range = 30
-        self.pipe_horizontal_range_increase = 5
+        self.flap_requested = False
+        # Physics always ticks at frame_rate; frames are drawn at render_fps and
+        # interpolated between the last two ticks
+        self.timestep = simulation.FixedTimestep()
+        self.render_fps = render_fps
+
+        # Replay being recorded for the current run, or being played back
+        self.replay = None
+        self.playback = playback
+
+        # Optional renderer that only updates changed screen regions during play
+        self.dirty_renderer = DirtyRenderer() if dirty_rendering else None
+
+        # Frame timing: collected while the overlay is shown or a dump was asked for
+        self.show_profiler = show_profiler
+        self.profile_path = profile_path
+        self.profiler = FrameProfiler() if show_profiler or profile_path else None
+        self.profiler_overlay = None
+
+        # Optional spectator.StatePublisher the state is written to every tick
+        self.state_publisher = state_publisher
+
+        # Leaderboard for the game over screen, answered by the run history thread
+        self.leaderboard = None
 
         # Game objects and groups
-        self.bird_manager = BirdManager()
-        self.bird = Bird(self.selected_bird_type)
-        self.pipes = pygame.sprite.Group()
-        self.coins = pygame.sprite.Group()
-        self.all_sprites = pygame.sprite.Group()
-        self.all_sprites.add(self.bird)
-
-        # Base position
+        self.bird_manager = app.bird_manager
+        self.bird_select_menu = BirdSelectMenu(self.bird_manager)
+        self.sim = GameSimulation(self.selected_bird_type, mask_collision=mask_collision, course=course)
+
+        # Network race: the server starts each run and has the last word on crashes;
+        # the other racers are drawn as ghosts over a full redraw
+        self.race_connection = race_connection
+        self.race_view = None
+        self.race_joined = False
+        if race_connection:
+            import race  # Only needed for network play
+            self.race_view = race.RaceView(self.sim, ghost_class=Bird)
+            self.dirty_renderer = None
+
+        # Base position, and where it was a tick earlier
         self.base_x = 0
-        self.base_y = screen_height - 112  # Adjust this value based on your base image height
+        self.prev_base_x = 0
 
         # Background scroll
         self.background_x = 0
 
+        if self.playback:
+            self.selected_bird_type = self.playback.bird_type
+            self.sim.mask_collision = self.playback.mask_collision
+            self.sim.course = simulation.load_course(self.playback.course) if self.playback.course else None
+            self.sim.legacy_level = self.playback.legacy_level
+            self.sim.legacy_physics = self.playback.legacy_physics
+            self.start_game()
+
     def load_high_score(self):
-        try:
-            with open(high_score_file, 'r') as f:
-                score_val = int(f.read())
-                return score_val
-        except (IOError, ValueError):
-            return 0
+        return app.save_store.get('high_score', 0)
 
     def save_high_score(self):
-        try:
-            with open(high_score_file, 'w') as f:
-                f.write(str(int(self.high_score)))
-        except IOError:
-            print("Error saving high score")
+        # Queued for the background writer so the frame never waits on the disk
+        app.save_store.update(high_score=int(self.high_score))
 
     def display_score(self):
+        screen = app.screen
+        font = app.font
+        small_font = app.small_font
+        game_over_image = app.images.game_over
+        message_image = app.images.message
         if self.game_state == 'game_active':
-            score_surface = font.render(str(int(self.score)), True, (255, 255, 255))
+            score_surface = render_score(int(self.sim.score))
             score_rect = score_surface.get_rect(center=(screen_width // 2, UI_PADDING + 20))
             screen.blit(score_surface, score_rect)
             
-            coin_surface = small_font.render(f'Coins: {self.coin_count}', True, (255, 255, 0))
+            coin_surface = text_cache.render(small_font, f'Coins: {self.sim.coin_count}', (255, 255, 0))
             coin_rect = coin_surface.get_rect(topleft=(UI_PADDING, UI_PADDING))
             screen.blit(coin_surface, coin_rect)
         
@@ -440,242 +639,236 @@ class Game:
                 game_over_rect = game_over_image.get_rect(center=(screen_width // 2, screen_height // 2 - 80))
                 screen.blit(game_over_image, game_over_rect)
 
-            score_surface = font.render(f'Score: {int(self.score)}', True, (255, 255, 255))
+            score_surface = text_cache.render(font, f'Score: {int(self.sim.score)}', (255, 255, 255))
             score_rect = score_surface.get_rect(center=(screen_width // 2, screen_height // 2))
             screen.blit(score_surface, score_rect)
 
-            high_score_surface = font.render(f'High Score: {int(self.high_score)}', True, (255, 255, 255))
+            high_score_surface = text_cache.render(font, f'High Score: {int(self.high_score)}', (255, 255, 255))
             high_score_rect = high_score_surface.get_rect(center=(screen_width // 2, screen_height // 2 + UI_SPACING))
             screen.blit(high_score_surface, high_score_rect)
 
-            restart_surface = font.render('Press R to Restart', True, (255, 255, 255))
+            restart_surface = text_cache.render(font, 'Press R to Restart', (255, 255, 255))
             restart_rect = restart_surface.get_rect(center=(screen_width // 2, screen_height // 2 + UI_SPACING * 2))
             screen.blit(restart_surface, restart_rect)
 
-            back_to_select_surface = font.render('Press B for Bird Select', True, (255, 255, 255))
+            back_to_select_surface = text_cache.render(font, 'Press B for Bird Select', (255, 255, 255))
             back_to_select_rect = back_to_select_surface.get_rect(center=(screen_width // 2, screen_height // 2 + UI_SPACING * 3))
             screen.blit(back_to_select_surface, back_to_select_rect)
+
+            self.draw_leaderboard()
+            if self.race_view:
+                self.draw_race_status(screen, screen_height // 2 + UI_SPACING * 4)
         
         elif self.game_state == 'start_screen':
             if message_image:
                 message_rect = message_image.get_rect(center=(screen_width // 2, screen_height // 2 - 50))
                 screen.blit(message_image, message_rect)
             else:
-                start_surface = font.render('Press Space to Start', True, (255, 255, 255))
+                start_surface = text_cache.render(font, 'Press Space to Start', (255, 255, 255))
                 start_rect = start_surface.get_rect(center=(screen_width // 2, screen_height // 2))
                 screen.blit(start_surface, start_rect)
 
-            high_score_display_surface = font.render(f'High Score: {int(self.high_score)}', True, (255, 255, 255))
+            high_score_display_surface = text_cache.render(font, f'High Score: {int(self.high_score)}', (255, 255, 255))
             high_score_display_rect = high_score_display_surface.get_rect(center=(screen_width // 2, screen_height // 2 + UI_SPACING))
             screen.blit(high_score_display_surface, high_score_display_rect)
+            if self.race_view:
+                self.draw_race_status(screen, screen_height // 2 + UI_SPACING * 2)
         
         elif self.game_state == 'bird_select':
-            overlay = pygame.Surface((screen_width, screen_height))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(128)
-            screen.blit(overlay, (0, 0))
-
-            title_surface = font.render('Select Bird', True, (255, 255, 0))
-            title_rect = title_surface.get_rect(center=(screen_width // 2, UI_PADDING + 20))
-            screen.blit(title_surface, title_rect)
-
-            y_offset = UI_PADDING + 80
-            available_birds = self.bird_manager.get_available_birds()
-            for i, bird_type in enumerate(available_birds):
-                box_height = 60
-                box_rect = pygame.Rect(UI_PADDING, y_offset + i * (box_height + 10) - (box_height // 2), screen_width - UI_PADDING * 2, box_height)
-                if bird_type == self.selected_bird_type:
-                    pygame.draw.rect(screen, (255, 255, 0), box_rect, 2)
-                else:
-                    pygame.draw.rect(screen, (255, 255, 255), box_rect, 1)
-
-                text_y_name = y_offset + i * (box_height + 10) - 10
-                text_y_desc = y_offset + i * (box_height + 10) + 10
-
-                if self.bird_manager.is_bird_unlocked(bird_type):
-                    bird_text = f"{bird_type.capitalize()} Bird"
-                    if bird_type == self.selected_bird_type:
-                        bird_text += " ✓"
-                    bird_surface = small_font.render(bird_text, True, (255, 255, 255))
-                    bird_rect = bird_surface.get_rect(center=(screen_width // 2, text_y_name))
-                    screen.blit(bird_surface, bird_rect)
-
-                    achievement_info = self.bird_manager.get_bird_achievement_info(bird_type)
-                    if achievement_info and 'description' in achievement_info:
-                        desc_surface = small_font.render(achievement_info['description'], True, (180, 180, 180))
-                        desc_rect = desc_surface.get_rect(center=(screen_width // 2, text_y_desc))
-                        screen.blit(desc_surface, desc_rect)
-                else:
-                    achievement = self.bird_manager.get_bird_achievement_info(bird_type)
-                    if achievement:
-                        lock_text = f"Locked: {achievement['description']}"
-                        lock_surface = small_font.render(lock_text, True, (128, 128, 128))
-                        lock_rect = lock_surface.get_rect(center=(screen_width // 2, text_y_name))
-                        screen.blit(lock_surface, lock_rect)
-
-            preview_bird = Bird(self.selected_bird_type)
-            preview_bird.rect.center = (screen_width // 2, screen_height - 100)
-            preview_bird.draw(screen)
-
-            nav_surface = small_font.render('↑↓ to select, Space to choose', True, (200, 200, 200))
-            nav_rect = nav_surface.get_rect(center=(screen_width // 2, screen_height - UI_PADDING - 30))
-            screen.blit(nav_surface, nav_rect)
-
-            select_surface = small_font.render('Click to Play', True, (255, 255, 255))
-            select_rect = select_surface.get_rect(center=(screen_width // 2, screen_height - UI_PADDING))
-            screen.blit(select_surface, select_rect)
+            self.bird_select_menu.draw(screen, self.selected_bird_type)
+
+    def draw_leaderboard(self):
+        # Nothing is drawn until the query has come back, so the frame never waits for it
+        if not self.leaderboard or not self.leaderboard.done() or self.leaderboard.exception():
+            return
+        board = self.leaderboard.result()
+        screen = app.screen
+        small_font = app.small_font
+        lines = [('Top Runs', (255, 255, 0))]
+        for rank, run in enumerate(board['top'], 1):
+            lines.append((f"{rank}. {run['score']}  {run['bird_type'].capitalize()}", (255, 255, 255)))
+        today_best = board['today'][0]['score'] if board['today'] else 0
+        bird_best = board['bird'][0]['score'] if board['bird'] else 0
+        lines.append((f"Today: {today_best}  {self.selected_bird_type.capitalize()}: {bird_best}", (200, 200, 200)))
+        for i, (text, color) in enumerate(lines):
+            line_surface = text_cache.render(small_font, text, color)
+            line_rect = line_surface.get_rect(center=(screen_width // 2, UI_PADDING + 10 + i * 20))
+            screen.blit(line_surface, line_rect)
 
     def reset_game(self):
-        if self.score > self.high_score:
-            self.high_score = self.score
+        if self.sim.score > self.high_score:
+            self.high_score = self.sim.score
             self.save_high_score()
-            self.bird_manager.update_score(self.selected_bird_type, self.score)
-        
-        self.score = 0
-        self.coin_count = 0
-        self.pipes_passed_count = 0
-        self.pipe_move_speed = 2.0
-        self.pipe_spawn_interval = 1800
-        self.difficulty_stage = 0
-        self.bird = Bird(self.selected_bird_type)
-        self.bird.rect.center = (50, screen_height // 2)
-        self.bird.velocity = 0
-        self.pipes.empty()
-        self.coins.empty()
-        self.all_sprites.empty()
-        self.all_sprites.add(self.bird)
-        self.game_state = 'game_active'
-        self.create_pipe_pair()
-        
+            self.bird_manager.update_score(self.selected_bird_type, self.sim.score)
+
+        self.start_game()
+
+    def end_game(self):
+        self.game_state = 'game_over'
+        app.sounds.hit.play()
+        app.sounds.die.play()
         if 'pygame' in sys.modules and hasattr(pygame.mixer, 'music'):
-            pygame.mixer.music.play(-1)
+            pygame.mixer.music.stop()
+        if self.playback:
+            return
 
-    def create_pipe_pair(self):
-        min_y = 100
-        max_y = screen_height - 100 - pipe_gap_size
-        if min_y >= max_y:
-            pipe_gap_center_y = screen_height // 2
-        else:
-            pipe_gap_center_y = random.randint(min_y, max_y)
+        self.replay.finish(self.sim.get_state())
+        app.save_store.writer.write(last_replay_file, self.replay.to_bytes())
+        app.run_history.record(self.sim.get_state(), self.selected_bird_type, self.sim.seed)
+        self.leaderboard = app.run_history.leaderboard(self.selected_bird_type)
 
-        if pipe_image:
-            current_pipe_width = pipe_image.get_width()
+        if self.sim.score > self.high_score:
+            self.high_score = self.sim.score
+            self.save_high_score()
+            self.bird_manager.update_score(self.selected_bird_type, self.sim.score)
+
+    def update_game(self):
+        # Update base position
+        self.prev_base_x = self.base_x
+        self.base_x -= self.sim.pipe_move_speed
+        if self.base_x <= -screen_width:
+            self.base_x += screen_width
+            self.prev_base_x += screen_width
+
+        if self.playback:
+            flap = self.playback.flap_at(self.sim.tick)
+            if flap:
+                app.sounds.flap.play()
         else:
-            current_pipe_width = 52
-
-        # Check for overlap with existing pipes
-        new_pipe_x = screen_width
-        for pipe in self.pipes:
-            # If there's a pipe within 100 pixels of the new pipe's position, adjust the new pipe's position
-            if abs(pipe.rect.x - new_pipe_x) < 100:
-                new_pipe_x = pipe.rect.x + 100
-
-        # Determine horizontal movement parameters based on difficulty stage
-        is_horizontal_mover = False
-        horizontal_speed = 0
-        horizontal_range = 0
-
-        # Introduce horizontal movement after the first difficulty increase (20 pipes passed)
-        if self.difficulty_stage > 0:
-            # Calculate movement probability, capped at 20%
-            movement_probability = min(0.2 * self.difficulty_stage, 0.2)  # Cap at 20%
-            
-            # Increase chance of horizontal movers and their parameters with difficulty
-            if random.random() < movement_probability:
-                is_horizontal_mover = True
-                horizontal_speed = self.base_horizontal_pipe_speed + self.difficulty_stage * self.horizontal_pipe_speed_increase
-                horizontal_range = self.base_pipe_horizontal_range + self.difficulty_stage * self.pipe_horizontal_range_increase
-                # Cap the horizontal range to prevent the gap from closing too much
-                max_horizontal_range = 60 # Define a maximum allowed horizontal range
-                horizontal_range = min(horizontal_range, max_horizontal_range)
-            
-            # Decide which pipe(s) move horizontally
-            if is_horizontal_mover:
-                move_both = random.random() < 0.5 # 50% chance both move
-                if move_both:
-                    # Pass inverted=True for top pipe, False for bottom
-                    top_pipe = Pipe(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed, is_horizontal_mover=True, horizontal_speed=horizontal_speed, horizontal_range=horizontal_range, inverted=True)
-                    bottom_pipe = Pipe(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed, is_horizontal_mover=True, horizontal_speed=horizontal_speed, horizontal_range=horizontal_range, inverted=False)
-                else:
-                    # Randomly choose one pipe to be a horizontal mover
-                    move_top = random.choice([True, False])
-                    if move_top:
-                        # Top pipe moves horizontally, bottom is static
-                        top_pipe = Pipe(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed, is_horizontal_mover=True, horizontal_speed=horizontal_speed, horizontal_range=horizontal_range, inverted=True)
-                        bottom_pipe = Pipe(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=False)
-                    else:
-                        # Bottom pipe moves horizontally, top is static
-                        top_pipe = Pipe(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=True)
-                        bottom_pipe = Pipe(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed, is_horizontal_mover=True, horizontal_speed=horizontal_speed, horizontal_range=horizontal_range, inverted=False)
+            flap = self.flap_requested
+            self.replay.record(flap)
+            if flap and self.race_view and not self.sim.game_over:
+                self.race_connection.send_flap(self.race_view.flap())
+        self.flap_requested = False
+
+        difficulty_stage = self.sim.difficulty_stage
+        state = self.race_view.step(flap) if self.race_view else self.sim.step(flap)
+        if self.state_publisher:
+            self.state_publisher.publish(self)
+
+        if state['coins_collected'] > 0:
+            app.sounds.point.play()
+        # In a race the crash predicted here waits for the server (see update_race)
+        if (state['done'] and not self.race_view) or (self.playback and state['tick'] >= self.playback.ticks):
+            self.end_game()
+        if state['difficulty_stage'] != difficulty_stage:
+            print(f"Difficulty Stage: {state['difficulty_stage']}, Pipe Speed: {state['pipe_move_speed']}")
+
+    def flap(self):
+        if self.game_state == 'game_active' and not self.playback:
+            self.flap_requested = True
+            app.sounds.flap.play()
+
+    def update_race(self):
+        # Messages from the race server since the last frame
+        view = self.race_view
+        for message in self.race_connection.poll():
+            view.handle(message)
+        if view.racing and view.score is None and self.game_state != 'game_active':
+            self.race_joined = False
+            self.start_game(race_started=True)
+        elif (view.score is not None or view.closed) and self.game_state == 'game_active':
+            self.end_game()
+
+    def draw_ghosts(self, surface):
+        # Other racers where the server last had them
+        view = self.race_view
+        for player_id, ghost in view.ghosts.items():
+            if player_id not in view.crashed:
+                surface.blit(ghost_image(ghost.image), (ghost.x, round(ghost.y)))
+
+    def draw_race_status(self, surface, center_y):
+        view = self.race_view
+        if view.closed:
+            text = 'Race server disconnected'
+        elif self.game_state == 'game_over':
+            if view.results:
+                place = next((i for i, result in enumerate(view.results, 1) if result[0] == view.player_id), 0)
+                text = f'Race place {place} of {len(view.results)}'
             else:
-                # No horizontal movement for this pair
-                top_pipe = Pipe(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=True)
-                bottom_pipe = Pipe(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=False)
+                text = f'Still racing: {len(view.ghosts) + 1 - len(view.crashed)}'
+        elif self.race_joined:
+            text = 'Waiting for the race to start'
         else:
-            # No horizontal movement at the start of the game
-            top_pipe = Pipe(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=True)
-            bottom_pipe = Pipe(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=False)
-
-        # Extend bottom pipe beyond screen
-        if pipe_image:
-            bottom_pipe.rect.height = screen_height * 2  # Make bottom pipe twice screen height
+            text = 'Space to join the next race'
+        status_surface = text_cache.render(app.small_font, text, (255, 255, 0))
+        surface.blit(status_surface, status_surface.get_rect(center=(screen_width // 2, center_y)))
+
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        if self.show_profiler and not self.profiler:
+            self.profiler = FrameProfiler()
+        elif not self.show_profiler and not self.profile_path:
+            self.profiler = None
+        if self.dirty_renderer:
+            self.dirty_renderer.invalidate()
+
+    def draw_profiler(self, surface):
+        if not self.profiler_overlay:
+            self.profiler_overlay = ProfilerOverlay()
+        return self.profiler_overlay.draw(surface, self.profiler)
+
+    def draw_frame(self, screen, frame_ms, profiler=None):
+        """ Draw everything onto screen without showing it, game sprites only while the game is active """
+        if app.images.background:
+            # Same scroll speed at any frame rate
+            self.background_x -= background_scroll_speed * frame_ms * frame_rate / 1000
+            if self.background_x <= -screen_width:
+                self.background_x += screen_width
+        if self.game_state == 'game_active':
+            alpha = self.timestep.alpha()
+            base_x = self.prev_base_x + (self.base_x - self.prev_base_x) * alpha
+            draw_playfield(screen, self.sim, self.background_x, base_x, True, alpha)
+            if self.race_view:
+                self.draw_ghosts(screen)
         else:
-            bottom_pipe.rect.height = screen_height * 2
-
-        self.pipes.add(top_pipe)
-        self.pipes.add(bottom_pipe)
-        self.all_sprites.add(top_pipe)
-        self.all_sprites.add(bottom_pipe)
-
-        # Add a coin randomly with a pipe pair
-        if random.random() < 0.5:  # 50% chance to spawn a coin
-            coin_x = new_pipe_x + current_pipe_width + 20
-            # Random position between pipes or in the gap
-            if random.random() < 0.5:  # 50% chance to be in the gap
-                # Random height within the pipe gap, with some margin from the edges
-                min_coin_y = pipe_gap_center_y - (pipe_gap_size // 2) + 30  # 30 pixels from top pipe
-                max_coin_y = pipe_gap_center_y + (pipe_gap_size // 2) - 30  # 30 pixels from bottom pipe
-                coin_y = random.randint(min_coin_y, max_coin_y)
-            else:  # 50% chance to be between pipes
-                # Random position between the pipes
-                coin_y = random.randint(50, screen_height - 50)  # Keep away from screen edges
-            coin = Coin(coin_x, coin_y)
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
+            draw_playfield(screen, self.sim, self.background_x, self.base_x, False)
+        if profiler:
+            profiler.lap('draw_playfield')
+
+        self.display_score()
+        if profiler:
+            profiler.lap('draw_hud')
 
     def run(self):
+        screen = app.screen
         running = True
-        pygame.time.set_timer(PIPE_SPAWN_EVENT, self.pipe_spawn_interval)
+        frame_ms = 0
 
         while running:
+            # Toggling the profiler takes effect from the next frame
+            profiler = self.profiler
+            show_profiler = self.show_profiler
+            self.sim.profiler = profiler
+            if profiler:
+                profiler.begin_frame()
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
+                    if event.key == pygame.K_F3:
+                        self.toggle_profiler()
+                    elif event.key == pygame.K_SPACE:
                         if self.game_state == 'start_screen':
                             self.game_state = 'bird_select'
                         elif self.game_state == 'bird_select':
                             # Start game from bird select
-                            self.start_game() # Call a new method to start the game
+                            self.start_game()
                         elif self.game_state == 'game_active':
-                            self.bird.flap(self)
+                            self.flap()
                     elif event.key == pygame.K_r and self.game_state == 'game_over':
                         # Restart game from game over
                         self.start_game() # Call the start game method to reset and begin
-                        sound_swoosh.play()
+                        app.sounds.swoosh.play()
                     elif event.key == pygame.K_SPACE and self.game_state == 'game_over':
                         # Restart game from game over with space bar
                         self.start_game()
-                        sound_swoosh.play()
+                        app.sounds.swoosh.play()
                     elif event.key == pygame.K_b and self.game_state == 'game_over':
                         self.game_state = 'bird_select'
-                        self.bird = Bird(self.selected_bird_type)
-                        self.bird.rect.center = (screen_width // 2, screen_height // 2)
                         # Reset difficulty parameters when going back to bird select from game over
-                        self.pipes_passed_count = 0
-                        self.pipe_move_speed = 2.0
-                        self.difficulty_stage = 0
+                        self.sim.reset(self.selected_bird_type)
 
                     elif self.game_state == 'bird_select':
                         available_birds = self.bird_manager.get_available_birds()
@@ -686,112 +879,144 @@ class Game:
                             self.selected_bird_type = available_birds[(current_index + 1) % len(available_birds)]
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if self.game_state == 'game_active':
-                        self.bird.flap(self)
+                        self.flap()
                     elif self.game_state == 'start_screen':
                          self.game_state = 'bird_select'
                     elif self.game_state == 'bird_select':
-                        mouse_pos = pygame.mouse.get_pos()
-                        y_offset_start = UI_PADDING + 80
-                        box_height = 60
-                        available_birds = self.bird_manager.get_available_birds()
-                        for i, bird_type in enumerate(available_birds):
-                            box_y_start = y_offset_start + i * (box_height + 10) - (box_height // 2)
-                            box_y_end = box_y_start + box_height
-                            if self.bird_manager.is_bird_unlocked(bird_type):
-                                if box_y_start <= mouse_pos[1] <= box_y_end:
-                                    self.selected_bird_type = bird_type
-                                    # Start game on click from bird select
-                                    self.start_game() # Call the start game method
-                                    sound_swoosh.play()
-                                    break
-
-                if event.type == PIPE_SPAWN_EVENT and self.game_state == 'game_active':
-                    self.create_pipe_pair()
-
+                        bird_type = self.bird_select_menu.bird_at(pygame.mouse.get_pos())
+                        if bird_type:
+                            self.selected_bird_type = bird_type
+                            # Start game on click from bird select
+                            self.start_game() # Call the start game method
+                            app.sounds.swoosh.play()
+
+            if self.race_view:
+                self.update_race()
+            if profiler:
+                profiler.lap('events')
+
+            # Physics runs at a fixed tick rate no matter how fast frames are drawn
             if self.game_state == 'game_active':
-                # Update base position
-                self.base_x -= self.pipe_move_speed
-                if self.base_x <= -screen_width:
-                    self.base_x = 0
-
-                # Update pipes and coins with the current pipe_move_speed
-                self.pipes.update(self.pipe_move_speed)
-                self.coins.update(self.pipe_move_speed)
-                self.bird.update()
-
-                collected_coins = pygame.sprite.spritecollide(self.bird, self.coins, True)
-                self.coin_count += len(collected_coins)
-                if len(collected_coins) > 0:
-                    sound_point.play()
-
-                if pygame.sprite.spritecollide(self.bird, self.pipes, False) or self.bird.rect.bottom >= screen_height or self.bird.rect.top <= 0:
-                    self.game_state = 'game_over'
-                    sound_hit.play()
-                    sound_die.play()
-                    if 'pygame' in sys.modules and hasattr(pygame.mixer, 'music'):
-                        pygame.mixer.music.stop()
-                    if self.score > self.high_score:
-                        self.high_score = self.score
-                        self.save_high_score()
-                        self.bird_manager.update_score(self.selected_bird_type, self.score)
-
-                for pipe in self.pipes:
-                    if not pipe.passed and pipe.rect.right < self.bird.rect.left:
-                        pipe.passed = True
-                        if pipe.pipe_type == -1:
-                            self.score += 1
-                            self.pipes_passed_count += 1
-                            if self.pipes_passed_count > 0 and self.pipes_passed_count % 20 == 0:
-                                self.pipe_move_speed *= 1.05
-                                self.difficulty_stage += 1
-                                print(f"Difficulty Stage: {self.difficulty_stage}, Pipe Speed: {self.pipe_move_speed}")
-
-            # Draw everything
-            if background_image:
-                self.background_x -= background_scroll_speed
-                if self.background_x <= -screen_width:
-                    self.background_x = 0
-                screen.blit(background_image, (self.background_x, 0))
-                screen.blit(background_image, (self.background_x + screen_width, 0))
+                for _ in range(self.timestep.advance(frame_ms)):
+                    self.update_game()
+                    if self.game_state != 'game_active':
+                        break
             else:
-                screen.fill((135, 206, 235))
-
-            # Only draw game sprites when game is active
-            if self.game_state == 'game_active':
-                self.all_sprites.draw(screen)
-
-            # Draw base
-            if base_image:
-                screen.blit(base_image, (self.base_x, self.base_y))
-                screen.blit(base_image, (self.base_x + screen_width, self.base_y))
-
-            self.display_score()
-            pygame.display.flip()
-            clock.tick(60)  # Single frame rate limit at the end of the loop
-
+                self.timestep.reset()
+                # Menus have no ticks; spectators get one state per frame
+                if self.state_publisher:
+                    self.state_publisher.publish(self)
+            if profiler:
+                profiler.lap('update')
+
+            if self.dirty_renderer and self.game_state == 'game_active':
+                rects = self.dirty_renderer.draw(screen, self)
+                if profiler:
+                    profiler.lap('draw')
+                if show_profiler:
+                    rects = rects + [self.draw_profiler(screen)]
+                    profiler.lap('overlay')
+                pygame.display.update(rects)
+                if profiler:
+                    profiler.lap('flip')
+            else:
+                self.draw_frame(screen, frame_ms, profiler)
+                if show_profiler:
+                    self.draw_profiler(screen)
+                    profiler.lap('overlay')
+                pygame.display.flip()
+                if profiler:
+                    profiler.lap('flip')
+                if self.dirty_renderer:
+                    self.dirty_renderer.invalidate()
+            frame_ms = app.clock.tick(self.render_fps)  # Single frame rate limit at the end of the loop
+            if profiler:
+                profiler.lap('idle')
+                profiler.end_frame()
+
+        if self.profiler and self.profile_path:
+            try:
+                self.profiler.dump(self.profile_path)
+            except IOError:
+                print("Error saving frame timings")
+        if self.race_connection:
+            self.race_connection.close()
+        if self.state_publisher:
+            self.state_publisher.close()
+        app.shutdown()
         pygame.quit()
         sys.exit()
 
-    def start_game(self):
+    def start_game(self, race_started=False):
+        if self.race_view and not race_started:
+            # Races are started by the server: join the next one and wait for it
+            self.race_connection.join(self.selected_bird_type)
+            self.race_joined = True
+            self.game_state = 'start_screen'
+            return
         self.game_state = 'game_active'
+        self.prev_base_x = self.base_x
+        app.sounds # Starts the mixer and loads the music on the first game
         if 'pygame' in sys.modules and hasattr(pygame.mixer, 'music') and not pygame.mixer.music.get_busy():
             pygame.mixer.music.play(-1)
-        self.score = 0
-        self.coin_count = 0
-        self.pipes_passed_count = 0
-        self.pipe_move_speed = 2.0
-        self.difficulty_stage = 0
-
-        self.pipes.empty()
-        self.coins.empty()
-        self.bird = Bird(self.selected_bird_type)
-        self.bird.rect.center = (50, screen_height // 2)
-        self.bird.velocity = 0
-        self.all_sprites.empty()
-        self.all_sprites.add(self.bird)
-        self.create_pipe_pair()
+        self.flap_requested = False
+        if self.playback:
+            self.sim.reset(self.playback.bird_type, self.playback.seed)
+        elif self.race_view:
+            # The race view has already reset the simulation to the race's seed
+            self.selected_bird_type = self.race_view.bird_type
+            self.replay = replay.Replay(self.selected_bird_type, self.sim.seed, course=self.race_view.course)
+        else:
+            self.sim.reset(self.selected_bird_type)
+            self.replay = replay.Replay(self.selected_bird_type, self.sim.seed, mask_collision=self.sim.mask_collision,
+                                        course=self.sim.course.name if self.sim.course else None)
 
 # Run the game
 if __name__ == '__main__':
-    game = Game()
+    import argparse
+    parser = argparse.ArgumentParser(description='Flappy Bird')
+    parser.add_argument('--replay', help='watch a recorded replay file at normal speed')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only redraw changed screen regions during play (static background, lower CPU)')
+    parser.add_argument('--mask-collision', action='store_true',
+                        help='crash only when opaque pixels of the bird and a pipe overlap (races use the server\'s mode)')
+    parser.add_argument('--profile', action='store_true', help='show the frame timing overlay (toggle with F3)')
+    parser.add_argument('--profile-out', metavar='PATH',
+                        help='write frame timing percentiles to PATH (.csv or .json) on exit')
+    parser.add_argument('--fps', type=int, default=frame_rate,
+                        help=f'frames drawn per second; physics always runs at {frame_rate} ticks per second')
+    parser.add_argument('--course', help='play a hand-authored course: a file, or a name from the courses directory')
+    parser.add_argument('--race', metavar='HOST:PORT', help='race other players on a race server (see race.py)')
+    parser.add_argument('--spectate', nargs='?', const='flappybird_state', metavar='NAME',
+                        help='publish the game state every tick to shared memory NAME for spectator.py viewers')
+    parser.add_argument('--asset-report', action='store_true', help='print load time and memory of every asset')
+    args = parser.parse_args()
+    app.preload()
+    if args.asset_report:
+        app.asset_manager.print_report()
+
+    course = None
+    if args.course:
+        try:
+            course = simulation.load_course(args.course)
+        except (IOError, ValueError) as e:
+            print(f"Error loading course {args.course}: {e}. Playing a generated level.")
+
+    race_connection = None
+    if args.race:
+        import race
+        host, _, port = args.race.partition(':')
+        race_connection = race.RaceConnection(host or race.default_host, int(port or race.default_port))
+
+    state_publisher = None
+    if args.spectate:
+        import spectator
+        try:
+            state_publisher = spectator.StatePublisher(args.spectate)
+        except FileExistsError as e:
+            print(f"Error publishing for spectators: {e}. Playing without spectators.")
+
+    game = Game(replay.Replay.load(args.replay) if args.replay else None, dirty_rendering=args.dirty_rects,
+                mask_collision=args.mask_collision, show_profiler=args.profile, profile_path=args.profile_out,
+                course=course, render_fps=args.fps, race_connection=race_connection, state_publisher=state_publisher)
     game.run() 
\ No newline at end of file
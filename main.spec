@@ -1,11 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# Ship the packed asset bundle when build_bundle.py has been run
+datas = [('assets', 'assets'), ('courses', 'courses'), ('birds.json', '.')]
+if os.path.exists('assets.bundle'):
+    datas.append(('assets.bundle', '.'))
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('assets', 'assets')],
+    datas=datas,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,690 @@
+import argparse
+import asyncio
+import queue
+import random
+import struct
+import threading
+import time
+from collections import deque
+from bird_registry import get_bird
+from frame_profiler import FrameProfiler
+import simulation
+import tournament
+from simulation import frame_rate
+
+# Races between several players on the same seeded pipe course. The server runs
+# every racer's game at the fixed tick rate and is the authority on flaps and
+# crashes. Each client steps its own game as soon as the player flaps and
+# corrects it when the server disagrees. Games are deterministic from the seed
+# and the flaps, so the server only broadcasts the ticks on which someone flapped
+# or crashed, plus an occasional keyframe of where every bird is.
+#
+# Messages (little endian): a type byte, then
+#   client JOIN      bird type length, bird type (utf-8); races in the next race
+#   client FLAP      tick: flap on the step after tick, as replay.Replay records it
+#   server WELCOME   player id
+#   server START     seed, course name length, racers, flags, course name, then
+#                    (id, bird type length, bird type) per racer. Flags hold the
+#                    server's collision mode, which every racer's game takes on.
+#   server TICK      tick, flaps, crashes, ids that flapped, (id, score) per crash.
+#                    Ticks between two TICKs had neither.
+#   server KEYFRAME  ticks stepped, birds, then (id, x, y, velocity) per bird flying,
+#                    as the game's unrounded floats
+#   server END       racers, then (id, score, ticks) per racer, best first
+default_host = '127.0.0.1'
+default_port = 5555
+
+MSG_JOIN = 1
+MSG_FLAP = 2
+MSG_WELCOME = 3
+MSG_START = 4
+MSG_TICK = 5
+MSG_KEYFRAME = 6
+MSG_END = 7
+MSG_CLOSED = 0  # Never sent: queued locally when the connection goes away
+
+TYPE = struct.Struct('<B')
+JOIN = struct.Struct('<B')
+FLAP = struct.Struct('<I')
+WELCOME = struct.Struct('<H')
+START = struct.Struct('<QBHB')
+START_MASK_COLLISION = 1
+RACER = struct.Struct('<HB')
+TICK = struct.Struct('<IHH')
+FLAPPER = struct.Struct('<H')
+CRASH = struct.Struct('<HI')
+KEYFRAME = struct.Struct('<IH')
+BIRD = struct.Struct('<Hddd')
+END = struct.Struct('<H')
+RESULT = struct.Struct('<HII')
+
+# Flaps stamped with a tick the server has not stepped yet wait for it; the
+# server runs this many ticks behind the race clock so they arrive in time
+input_delay_ticks = 6
+send_ticks = 2                # Ticks of updates sent together
+keyframe_ticks = frame_rate * 5
+max_race_ticks = tournament.default_max_steps
+max_write_buffer = 256 * 1024  # Players this far behind on reading are dropped
+report_seconds = 10.0
+
+def encode_join(bird_type):
+    name = bird_type.encode('utf-8')
+    return TYPE.pack(MSG_JOIN) + JOIN.pack(len(name)) + name
+
+def encode_flap(tick):
+    return TYPE.pack(MSG_FLAP) + FLAP.pack(tick)
+
+def encode_welcome(player_id):
+    return TYPE.pack(MSG_WELCOME) + WELCOME.pack(player_id)
+
+def encode_start(seed, course, racers, mask_collision=False):
+    course = (course or '').encode('utf-8')
+    flags = START_MASK_COLLISION if mask_collision else 0
+    parts = [TYPE.pack(MSG_START), START.pack(seed, len(course), len(racers), flags), course]
+    for player_id, bird_type in racers.items():
+        name = bird_type.encode('utf-8')
+        parts += [RACER.pack(player_id, len(name)), name]
+    return b''.join(parts)
+
+def encode_tick(tick, flaps, crashes):
+    return (TYPE.pack(MSG_TICK) + TICK.pack(tick, len(flaps), len(crashes))
+            + struct.pack(f'<{len(flaps)}H', *flaps) + b''.join(CRASH.pack(*crash) for crash in crashes))
+
+def encode_keyframe(tick, birds):
+    return TYPE.pack(MSG_KEYFRAME) + KEYFRAME.pack(tick, len(birds)) + b''.join(BIRD.pack(*bird) for bird in birds)
+
+def encode_end(results):
+    return TYPE.pack(MSG_END) + END.pack(len(results)) + b''.join(RESULT.pack(*result) for result in results)
+
+async def read_message(reader):
+    """ Next server message as a tuple starting with its type """
+    kind = (await reader.readexactly(TYPE.size))[0]
+    if kind == MSG_TICK:
+        tick, flap_count, crash_count = TICK.unpack(await reader.readexactly(TICK.size))
+        body = await reader.readexactly(flap_count * FLAPPER.size + crash_count * CRASH.size)
+        flaps = struct.unpack_from(f'<{flap_count}H', body)
+        crashes = [CRASH.unpack_from(body, flap_count * FLAPPER.size + i * CRASH.size) for i in range(crash_count)]
+        return kind, tick, flaps, crashes
+    if kind == MSG_KEYFRAME:
+        tick, count = KEYFRAME.unpack(await reader.readexactly(KEYFRAME.size))
+        body = await reader.readexactly(count * BIRD.size)
+        return kind, tick, [BIRD.unpack_from(body, i * BIRD.size) for i in range(count)]
+    if kind == MSG_WELCOME:
+        return kind, WELCOME.unpack(await reader.readexactly(WELCOME.size))[0]
+    if kind == MSG_START:
+        seed, course_length, count, flags = START.unpack(await reader.readexactly(START.size))
+        course = (await reader.readexactly(course_length)).decode('utf-8') or None
+        racers = {}
+        for _ in range(count):
+            player_id, length = RACER.unpack(await reader.readexactly(RACER.size))
+            racers[player_id] = (await reader.readexactly(length)).decode('utf-8')
+        return kind, seed, course, racers, bool(flags & START_MASK_COLLISION)
+    if kind == MSG_END:
+        count = END.unpack(await reader.readexactly(END.size))[0]
+        body = await reader.readexactly(count * RESULT.size)
+        return kind, [RESULT.unpack_from(body, i * RESULT.size) for i in range(count)]
+    raise ConnectionError(f"Unknown race message {kind}")
+
+async def read_client_message(reader):
+    """ Next client message as (type, value, bytes read) """
+    kind = (await reader.readexactly(TYPE.size))[0]
+    if kind == MSG_FLAP:
+        return kind, FLAP.unpack(await reader.readexactly(FLAP.size))[0], TYPE.size + FLAP.size
+    if kind == MSG_JOIN:
+        length = JOIN.unpack(await reader.readexactly(JOIN.size))[0]
+        name = (await reader.readexactly(length)).decode('utf-8', errors='replace')
+        return kind, name, TYPE.size + JOIN.size + length
+    raise ConnectionError(f"Unknown race message {kind}")
+
+class Player:
+    """ A connection to the server and its game in the current race """
+
+    def __init__(self, player_id, writer):
+        self.id = player_id
+        self.writer = writer
+        self.bird_type = None  # Set by JOIN: races in the next race
+        self.sim = None
+        self.flaps = deque()   # Ticks of flaps not stepped yet
+        self.finished = True
+        self.connected = True
+        self.connected_at = time.monotonic()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, data):
+        if not self.connected:
+            return
+        if self.writer.transport.get_write_buffer_size() > max_write_buffer:
+            print(f"Dropping player {self.id}: not reading race updates")
+            self.connected = False
+            self.writer.close()
+            return
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+    def traffic(self):
+        seconds = max(time.monotonic() - self.connected_at, 1e-3)
+        return self.bytes_sent / seconds, self.bytes_received / seconds
+
+class RaceServer:
+    """ Authoritative races for everyone connected. Players join the next race;
+    it starts once min_players have joined, or lobby_seconds after the first
+    did, and ends when every bird has crashed or after max_ticks. """
+
+    def __init__(self, min_players=2, lobby_seconds=3.0, course=None, max_ticks=max_race_ticks,
+                 mask_collision=False):
+        self.min_players = min_players
+        self.lobby_seconds = lobby_seconds
+        self.course = course
+        self.mask_collision = mask_collision
+        self.max_ticks = max_ticks
+        self.players = {}
+        self.next_id = 1
+        self.lobby_since = None
+        self.racers = []    # Players in the current race, empty between races
+        self.seed = None
+        self.tick = 0
+        self.delay = 0
+        self.pending = bytearray()  # Updates not sent yet, the same bytes for every racer
+        self.sent_tick = -1
+        self.races = 0
+        self.departed = []  # Traffic of players who left, for the report
+        self.profiler = FrameProfiler(window=max_race_ticks)
+
+    def new_id(self):
+        # Ids wrap around on a long running server; skip the ones still connected
+        while self.next_id in self.players:
+            self.next_id = self.next_id % 0xFFFF + 1
+        player_id = self.next_id
+        self.next_id = self.next_id % 0xFFFF + 1
+        return player_id
+
+    async def handle(self, reader, writer):
+        """ asyncio.start_server callback: one task per connection """
+        player = Player(self.new_id(), writer)
+        self.players[player.id] = player
+        player.send(encode_welcome(player.id))
+        try:
+            while True:
+                kind, value, size = await read_client_message(reader)
+                player.bytes_received += size
+                if kind == MSG_FLAP:
+                    if not player.finished:
+                        player.flaps.append(value)
+                else:
+                    # Unknown bird types race as the default bird
+                    player.bird_type = get_bird(value).name
+        except (asyncio.IncompleteReadError, ConnectionError, UnicodeError):
+            pass
+        finally:
+            # A racer who leaves crashes on the next tick
+            player.connected = False
+            player.bird_type = None
+            del self.players[player.id]
+            self.departed.append(player.traffic())
+            writer.close()
+
+    async def run(self):
+        """ Step races at the fixed tick rate until cancelled """
+        loop = asyncio.get_running_loop()
+        timestep = simulation.FixedTimestep()
+        last = loop.time()
+        while True:
+            now = loop.time()
+            for _ in range(timestep.advance((now - last) * 1000)):
+                self.update()
+            last = now
+            await asyncio.sleep((timestep.tick_ms - timestep.accumulator) / 1000)
+
+    async def report_every(self, seconds=report_seconds):
+        while True:
+            await asyncio.sleep(seconds)
+            print_report(self.report())
+
+    def update(self):
+        if not self.racers:
+            self.update_lobby()
+            return
+        if self.delay:
+            self.delay -= 1
+            return
+
+        profiler = self.profiler
+        profiler.begin_frame()
+        tick = self.tick
+        flaps = []
+        crashes = []
+        for player in self.racers:
+            if player.finished:
+                continue
+            # Late flaps are stepped now; several arriving together make one flap
+            flap = False
+            while player.flaps and player.flaps[0] <= tick:
+                player.flaps.popleft()
+                flap = True
+            if flap:
+                flaps.append(player.id)
+            state = player.sim.step(flap)
+            if state['done'] or not player.connected or state['tick'] >= self.max_ticks:
+                player.finished = True
+                crashes.append((player.id, int(state['score'])))
+        self.tick += 1
+        profiler.lap('simulate')
+
+        if flaps or crashes:
+            self.add_tick(tick, flaps, crashes)
+        finished = all(player.finished for player in self.racers)
+        if self.tick % keyframe_ticks == 0:
+            self.add_tick(tick)
+            self.pending += encode_keyframe(self.tick, [(player.id, player.sim.bird.x, player.sim.bird.y,
+                                                         player.sim.bird.velocity)
+                                                        for player in self.racers if not player.finished])
+        if self.tick % send_ticks == 0 or finished:
+            # Even a quiet stretch is sent, so clients know those ticks have passed
+            self.add_tick(tick)
+            self.broadcast(bytes(self.pending))
+            self.pending.clear()
+        profiler.lap('send')
+        profiler.end_frame()
+
+        if finished:
+            self.end_race()
+
+    def add_tick(self, tick, flaps=(), crashes=()):
+        if flaps or crashes or self.sent_tick != tick:
+            self.pending += encode_tick(tick, flaps, crashes)
+            self.sent_tick = tick
+
+    def broadcast(self, data):
+        for player in self.racers:
+            player.send(data)
+
+    def update_lobby(self):
+        joined = [player for player in self.players.values() if player.bird_type]
+        if not joined:
+            self.lobby_since = None
+            return
+        now = time.monotonic()
+        if self.lobby_since is None:
+            self.lobby_since = now
+        if len(joined) >= self.min_players or now - self.lobby_since >= self.lobby_seconds:
+            self.start_race(joined)
+
+    def start_race(self, players):
+        self.seed = random.randrange(2 ** 32)
+        self.tick = 0
+        self.sent_tick = -1
+        self.delay = input_delay_ticks
+        self.pending.clear()
+        self.lobby_since = None
+        for player in players:
+            player.sim = simulation.Simulation(player.bird_type, self.seed, mask_collision=self.mask_collision,
+                                               course=self.course)
+            player.flaps.clear()
+            player.finished = False
+            player.bird_type = None  # Racing again means joining again
+        self.racers = players
+        self.broadcast(encode_start(self.seed, self.course.name if self.course else None,
+                                    {player.id: player.sim.bird_type for player in players}, self.mask_collision))
+
+    def end_race(self):
+        results = sorted(((player.id, int(player.sim.score), player.sim.tick) for player in self.racers),
+                         key=lambda result: (result[1], result[2]), reverse=True)
+        self.broadcast(encode_end(results))
+        self.races += 1
+        winner, score, _ = results[0]
+        print(f"Race {self.races}: {len(results)} racers over {self.tick / frame_rate:.1f}s, "
+              f"player {winner} won with {score}")
+        self.racers = []
+
+    def report(self):
+        """ Tick timing and per-client bandwidth so far """
+        summary = self.profiler.summary()
+        traffic = self.departed + [player.traffic() for player in self.players.values()]
+        sent = [out for out, _ in traffic] or [0.0]
+        received = [incoming for _, incoming in traffic] or [0.0]
+        return {
+            'races': self.races,
+            'players': len(self.players),
+            'racing': sum(not player.finished for player in self.racers),
+            'clients_seen': len(traffic),
+            'tick': summary['frame'],
+            'sections': summary['sections'],
+            'bytes_out_per_sec': {'mean': sum(sent) / len(sent), 'max': max(sent)},
+            'bytes_in_per_sec': {'mean': sum(received) / len(received), 'max': max(received)},
+        }
+
+def print_report(report):
+    tick = report['tick']
+    print(f"{report['players']} connected, {report['racing']} racing, {report['races']} races finished")
+    print(f"  tick ms   p50 {tick['p50']:.3f}  p95 {tick['p95']:.3f}  p99 {tick['p99']:.3f}  "
+          f"max {tick['max']:.3f}  ({tick['samples']} ticks, budget {1000 / frame_rate:.1f})")
+    for name, stats in report['sections'].items():
+        print(f"    {name:<9} p50 {stats['p50']:.3f}  p99 {stats['p99']:.3f}")
+    sent = report['bytes_out_per_sec']
+    received = report['bytes_in_per_sec']
+    print(f"  per client over {report['clients_seen']} clients: out {sent['mean'] / 1024:.2f} KB/s "
+          f"(max {sent['max'] / 1024:.2f}), in {received['mean']:.0f} B/s (max {received['max']:.0f})")
+
+class RaceView:
+    """ One racer's picture of a race, fed with server messages. Its own game (sim)
+    is predicted: it steps as soon as the player flaps, and is rewound to the
+    server's game when its flaps or crash turn out different, and at every
+    keyframe. With a ghost_class the other racers are followed as birds stepped
+    on the server's ticks. """
+
+    def __init__(self, sim, ghost_class=None):
+        self.sim = sim
+        self.ghost_class = ghost_class
+        self.player_id = None
+        self.racing = False
+        self.closed = False
+        self.seed = None
+        self.bird_type = None
+        self.course = None
+        self.ghosts = {}
+        self.confirmed = None  # Own game as the server has it, stepped on its ticks
+        self.server_tick = 0   # Ticks the server has stepped
+        self.clock = 0         # Ticks of the race played locally, crashed or not
+        self.inputs = set()    # Ticks flapped on locally the server has not confirmed
+        self.crashed = set()
+        self.score = None      # Own score once the server has us crashed
+        self.results = None
+        self.corrections = 0
+
+    def handle(self, message):
+        kind = message[0]
+        if kind == MSG_TICK:
+            if self.racing:
+                self.advance(*message[1:])
+        elif kind == MSG_KEYFRAME:
+            if self.racing:
+                self.keyframe(*message[1:])
+        elif kind == MSG_START:
+            self.start(*message[1:])
+        elif kind == MSG_END:
+            self.results = message[1]
+            self.racing = False
+        elif kind == MSG_WELCOME:
+            self.player_id = message[1]
+        elif kind == MSG_CLOSED:
+            self.racing = False
+            self.closed = True
+
+    def start(self, seed, course, racers, mask_collision):
+        self.seed = seed
+        self.course = course
+        self.bird_type = racers[self.player_id]
+        try:
+            self.sim.course = simulation.load_course(course) if course else None
+        except (IOError, ValueError) as e:
+            print(f"Error loading race course {course}: {e}. The server's pipes will not match.")
+            self.sim.course = None
+        # The server decides crashes, so collide the way it does
+        self.sim.mask_collision = mask_collision
+        self.sim.reset(self.bird_type, seed)
+        self.confirmed = simulation.Simulation(self.bird_type, seed, mask_collision=mask_collision,
+                                               course=self.sim.course)
+        self.ghosts = {}
+        if self.ghost_class:
+            self.ghosts = {player_id: self.ghost_class(bird_type) for player_id, bird_type in racers.items()
+                           if player_id != self.player_id}
+        self.server_tick = 0
+        self.clock = 0
+        self.inputs = set()
+        self.crashed = set()
+        self.score = None
+        self.results = None
+        self.racing = True
+
+    def flap(self):
+        """ Note a flap for the next local step; returns the tick to send to the server """
+        self.inputs.add(self.clock)
+        return self.clock
+
+    def step(self, flap=False):
+        """ Step the predicted game through one tick of the race; the race goes on
+        while a crash predicted here waits for the server """
+        self.clock += 1
+        return self.sim.step(flap)
+
+    def advance(self, tick, flaps, crashes):
+        flaps = set(flaps)
+        mispredicted = False
+        while self.server_tick <= tick:
+            flapping = flaps if self.server_tick == tick else ()
+            for player_id, ghost in self.ghosts.items():
+                if player_id not in self.crashed:
+                    if player_id in flapping:
+                        ghost.flap()
+                    ghost.update()
+            if self.score is None:
+                own_flap = self.player_id in flapping
+                self.confirmed.step(own_flap)
+                if own_flap != (self.server_tick in self.inputs):
+                    mispredicted = True
+                self.inputs.discard(self.server_tick)
+            self.server_tick += 1
+        for player_id, score in crashes:
+            self.crashed.add(player_id)
+            if player_id == self.player_id:
+                self.score = score
+                # A hit the local game missed; a race that ran out is not one
+                mispredicted = mispredicted or (self.confirmed.game_over and not self.sim.game_over)
+                self.confirmed.game_over = True
+        # A crash predicted on a tick the server has stepped without one did not happen
+        if self.sim.game_over and self.score is None and self.server_tick >= self.sim.tick:
+            mispredicted = True
+        if mispredicted:
+            self.reconcile()
+
+    def keyframe(self, tick, birds):
+        if tick != self.server_tick:
+            return
+        for player_id, x, y, velocity in birds:
+            bird = self.confirmed.bird if player_id == self.player_id else self.ghosts.get(player_id)
+            if bird:
+                set_bird(bird, x, y, velocity)
+        if self.score is None:
+            self.reconcile()
+
+    def reconcile(self):
+        # Rewind to the game the server confirmed (bird, crash, score, coins) and
+        # replay the own flaps it has not stepped yet up to the race clock. A
+        # client behind the server catches up to it.
+        sim = self.sim
+        predicted = (sim.bird.x, sim.bird.y, sim.bird.velocity, sim.score, sim.coin_count, sim.game_over)
+        sim.copy_state(self.confirmed)
+        self.clock = max(self.clock, self.server_tick)
+        for tick in range(self.server_tick, self.clock):
+            sim.step(tick in self.inputs)
+        if (sim.bird.x, sim.bird.y, sim.bird.velocity, sim.score, sim.coin_count, sim.game_over) != predicted:
+            self.corrections += 1
+
+def set_bird(bird, x, y, velocity):
+    bird.x = bird.prev_x = x
+    bird.y = bird.prev_y = y
+    bird.velocity = velocity
+    bird.rect.x = x
+    bird.rect.y = y
+
+class RaceConnection:
+    """ Client connection run on a background thread, so the game loop never
+    waits on the network: messages are collected with poll() every frame. """
+
+    def __init__(self, host=default_host, port=default_port):
+        self.host = host
+        self.port = port
+        self.messages = queue.Queue()
+        self.loop = asyncio.new_event_loop()
+        self.writer = None
+        self.unsent = []  # Written before the connection was up
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._receive(),),
+                                       name='race-client', daemon=True)
+        self.thread.start()
+
+    def join(self, bird_type):
+        self.send(encode_join(bird_type))
+
+    def send_flap(self, tick):
+        self.send(encode_flap(tick))
+
+    def send(self, data):
+        self.loop.call_soon_threadsafe(self._write, data)
+
+    def poll(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        if self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._close)
+            self.thread.join(timeout=1.0)
+
+    def _write(self, data):
+        if self.writer:
+            self.writer.write(data)
+        else:
+            self.unsent.append(data)
+
+    def _close(self):
+        if self.writer:
+            self.writer.close()
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+
+    async def _receive(self):
+        try:
+            reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            for data in self.unsent:
+                self.writer.write(data)
+            self.unsent = []
+            while True:
+                self.messages.put(await read_message(reader))
+        except (OSError, asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Race server connection closed: {e}")
+        except asyncio.CancelledError:
+            pass
+        self.messages.put((MSG_CLOSED,))
+
+class Bot:
+    """ Headless racer playing the gap follower, for load tests """
+
+    def __init__(self, bird_type='blue', races=1):
+        self.bird_type = bird_type
+        self.races = races
+        self.view = RaceView(simulation.Simulation(bird_type))
+        self.writer = None
+        self.finished = 0
+        self.scores = []
+
+    async def run(self, host, port):
+        reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(encode_join(self.bird_type))
+        try:
+            while self.finished < self.races:
+                message = await read_message(reader)
+                self.view.handle(message)
+                if message[0] == MSG_END:
+                    self.finished += 1
+                    self.scores.append(self.view.score or 0)
+                    if self.finished < self.races:
+                        self.writer.write(encode_join(self.bird_type))
+        finally:
+            self.writer.close()
+
+    def step(self):
+        view = self.view
+        if not view.racing or view.score is not None:
+            return
+        flap = not view.sim.game_over and tournament.gap_follower_policy(view.sim)
+        if flap:
+            self.writer.write(encode_flap(view.flap()))
+        view.step(flap)
+
+async def drive_bots(bots):
+    # One clock for every bot instead of a timer each
+    loop = asyncio.get_running_loop()
+    timestep = simulation.FixedTimestep()
+    last = loop.time()
+    while True:
+        now = loop.time()
+        for _ in range(timestep.advance((now - last) * 1000)):
+            for bot in bots:
+                bot.step()
+        last = now
+        await asyncio.sleep((timestep.tick_ms - timestep.accumulator) / 1000)
+
+async def run_bots(host, port, clients, races, bird_types):
+    bots = [Bot(bird_types[i % len(bird_types)], races) for i in range(clients)]
+    driver = asyncio.create_task(drive_bots(bots))
+    try:
+        await asyncio.gather(*(bot.run(host, port) for bot in bots))
+    finally:
+        driver.cancel()
+    return bots
+
+async def load_test(host, port, clients, races, bird_types, max_ticks):
+    """ A server and clients bots on localhost; returns the server report and the bots """
+    server = RaceServer(min_players=clients, lobby_seconds=10.0, max_ticks=max_ticks)
+    listener = await asyncio.start_server(server.handle, host, port)
+    ticker = asyncio.create_task(server.run())
+    try:
+        bots = await run_bots(host, port, clients, races, bird_types)
+    finally:
+        ticker.cancel()
+        listener.close()
+    return server.report(), bots
+
+def print_bots(bots):
+    scores = [score for bot in bots for score in bot.scores]
+    corrections = sum(bot.view.corrections for bot in bots)
+    print(f"{len(bots)} bots, {len(scores)} runs, mean score {sum(scores) / max(len(scores), 1):.1f}, "
+          f"{corrections} predictions corrected")
+
+async def serve(host, port, server):
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Race server on {host}:{port}, {server.min_players} players or {server.lobby_seconds:.0f}s to start")
+    async with listener:
+        await asyncio.gather(server.run(), server.report_every())
+
+def main():
+    parser = argparse.ArgumentParser(description='Multiplayer race server, headless bot clients and load test')
+    parser.add_argument('mode', choices=('server', 'bots', 'loadtest'))
+    parser.add_argument('--host', default=default_host)
+    parser.add_argument('--port', type=int, default=default_port)
+    parser.add_argument('--min-players', type=int, default=2, help='server: racers that start a race at once')
+    parser.add_argument('--lobby-seconds', type=float, default=3.0,
+                        help='server: start with fewer racers this long after the first joined')
+    parser.add_argument('--course', help='server: race a hand-authored course instead of a generated level')
+    parser.add_argument('--mask-collision', action='store_true',
+                        help='server: pixel-perfect collision for every racer instead of rectangles')
+    parser.add_argument('--clients', type=int, default=100, help='bots and loadtest: headless racers')
+    parser.add_argument('--races', type=int, default=1, help='bots and loadtest: races each bot runs')
+    parser.add_argument('--birds', nargs='+', default=['blue', 'red', 'yellow'], help='bird types the bots use')
+    parser.add_argument('--seconds', type=float, default=30.0, help='loadtest: longest race')
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'server':
+            course = simulation.load_course(args.course) if args.course else None
+            asyncio.run(serve(args.host, args.port, RaceServer(args.min_players, args.lobby_seconds, course,
+                                                                 mask_collision=args.mask_collision)))
+        elif args.mode == 'bots':
+            print_bots(asyncio.run(run_bots(args.host, args.port, args.clients, args.races, args.birds)))
+        else:
+            start = time.perf_counter()
+            report, bots = asyncio.run(load_test(args.host, args.port, args.clients, args.races, args.birds,
+                                                 round(args.seconds * frame_rate)))
+            print_report(report)
+            print_bots(bots)
+            print(f"Load test took {time.perf_counter() - start:.1f}s")
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
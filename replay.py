@@ -0,0 +1,182 @@
+import argparse
+import os
+import struct
+import time
+import zlib
+import simulation
+
+# File layout (little endian):
+#   magic 'FBRP', format version, flags, bird type length, course name length, seed,
+#   ticks, score, coins, bird type (utf-8), course name (utf-8), zlib-compressed
+#   bitstream with one flap bit per tick
+# Version 2 files have no course name, version 1 files no flags byte either. Both
+# were recorded before levels were generated ahead and play with legacy_level.
+# Versions 1 to 3 predate sub-pixel positions and play with legacy_physics.
+REPLAY_MAGIC = b'FBRP'
+REPLAY_VERSION = 4
+PREFIX = struct.Struct('<4sB')
+HEADER = struct.Struct('<4sBBBBQIII')
+HEADER_V2 = struct.Struct('<4sBBBQIII')
+HEADER_V1 = struct.Struct('<4sBBQIII')
+
+# Header flags
+FLAG_MASK_COLLISION = 1
+FLAG_LEGACY_LEVEL = 2
+FLAG_LEGACY_PHYSICS = 4
+
+class ReplayError(Exception):
+    pass
+
+class Replay:
+    """ A run stored as its seed plus one flap/no-flap bit per simulation tick """
+
+    def __init__(self, bird_type, seed, ticks=0, flaps=None, score=0, coin_count=0, mask_collision=False,
+                 course=None, legacy_level=False, legacy_physics=False):
+        self.bird_type = bird_type
+        self.seed = seed
+        self.mask_collision = mask_collision
+        self.course = course  # Name of the hand-authored course played, if any
+        self.legacy_level = legacy_level
+        self.legacy_physics = legacy_physics
+        self.ticks = ticks
+        self.flaps = flaps if flaps is not None else bytearray()
+        self.score = score
+        self.coin_count = coin_count
+
+    def record(self, flap):
+        if self.ticks % 8 == 0:
+            self.flaps.append(0)
+        if flap:
+            self.flaps[-1] |= 1 << (self.ticks % 8)
+        self.ticks += 1
+
+    def flap_at(self, tick):
+        # tick is zero based: the input applied on the (tick + 1)-th step
+        return bool(self.flaps[tick >> 3] & (1 << (tick & 7)))
+
+    def finish(self, state):
+        self.score = state['score']
+        self.coin_count = state['coin_count']
+
+    def to_bytes(self):
+        bird_type = self.bird_type.encode('utf-8')
+        course = (self.course or '').encode('utf-8')
+        flags = ((FLAG_MASK_COLLISION if self.mask_collision else 0) | (FLAG_LEGACY_LEVEL if self.legacy_level else 0)
+                 | (FLAG_LEGACY_PHYSICS if self.legacy_physics else 0))
+        header = HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, flags, len(bird_type), len(course), self.seed,
+                             self.ticks, self.score, self.coin_count)
+        return header + bird_type + course + zlib.compress(bytes(self.flaps), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            magic, version = PREFIX.unpack_from(data)
+            if magic != REPLAY_MAGIC:
+                raise ReplayError("Not a replay file")
+            if version in (REPLAY_VERSION, 3):
+                _, _, flags, name_length, course_length, seed, ticks, score, coin_count = HEADER.unpack_from(data)
+                if version == 3:
+                    flags |= FLAG_LEGACY_PHYSICS
+                offset = HEADER.size
+            elif version == 2:
+                _, _, flags, name_length, seed, ticks, score, coin_count = HEADER_V2.unpack_from(data)
+                flags |= FLAG_LEGACY_LEVEL | FLAG_LEGACY_PHYSICS
+                course_length = 0
+                offset = HEADER_V2.size
+            elif version == 1:
+                _, _, name_length, seed, ticks, score, coin_count = HEADER_V1.unpack_from(data)
+                flags = FLAG_LEGACY_LEVEL | FLAG_LEGACY_PHYSICS
+                course_length = 0
+                offset = HEADER_V1.size
+            else:
+                raise ReplayError(f"Unsupported replay version {version}")
+        except struct.error as e:
+            raise ReplayError(f"Truncated replay header: {e}")
+        bird_type = data[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        course = data[offset:offset + course_length].decode('utf-8') or None
+        try:
+            flaps = bytearray(zlib.decompress(data[offset + course_length:]))
+        except zlib.error as e:
+            raise ReplayError(f"Corrupt replay input stream: {e}")
+        if len(flaps) * 8 < ticks:
+            raise ReplayError("Replay input stream is shorter than its tick count")
+        return cls(bird_type, seed, ticks, flaps, score, coin_count, bool(flags & FLAG_MASK_COLLISION),
+                   course, bool(flags & FLAG_LEGACY_LEVEL), bool(flags & FLAG_LEGACY_PHYSICS))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def simulate(replay, sim=None):
+    """ Re-run a replay headlessly as fast as possible and return the final state """
+    course = simulation.load_course(replay.course) if replay.course else None
+    if sim is None:
+        sim = simulation.Simulation(replay.bird_type, replay.seed, replay.mask_collision, course, replay.legacy_level,
+                                    replay.legacy_physics)
+    else:
+        sim.mask_collision = replay.mask_collision
+        sim.course = course
+        sim.legacy_level = replay.legacy_level
+        sim.legacy_physics = replay.legacy_physics
+        sim.reset(replay.bird_type, replay.seed)
+    state = sim.get_state()
+    for tick in range(replay.ticks):
+        state = sim.step(replay.flap_at(tick))
+    return state
+
+def validate(replay, sim=None):
+    state = simulate(replay, sim)
+    return state['score'] == replay.score and state['coin_count'] == replay.coin_count
+
+def _validate_files(paths):
+    sim = simulation.Simulation()
+    results = []
+    for path in paths:
+        try:
+            results.append((path, validate(Replay.load(path), sim)))
+        except (IOError, ValueError, ReplayError) as e:
+            print(f"Error loading replay {path}: {e}")
+            results.append((path, False))
+    return results
+
+def validate_corpus(paths, workers=None, chunk_size=64):
+    """ Check every replay's recorded score across a process pool; yields (path, ok) """
+    # Imported here so the game, which only records replays, does not pay for it
+    from concurrent.futures import ProcessPoolExecutor
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for results in pool.map(_validate_files, chunks):
+            yield from results
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate recorded replays against the simulation')
+    parser.add_argument('paths', nargs='+', help='replay files or directories of replays')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            paths.append(path)
+
+    start = time.perf_counter()
+    failures = 0
+    for path, ok in validate_corpus(paths, args.workers):
+        if not ok:
+            failures += 1
+            print(f"MISMATCH {path}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths) - failures}/{len(paths)} replays valid in {elapsed:.2f}s")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
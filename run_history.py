@@ -0,0 +1,177 @@
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from simulation import frame_rate
+
+# Every finished run, one row each. The indexes serve the leaderboard queries
+# straight from the index (top N by score overall, per bird and per day), so
+# they stay fast however many rows the table holds.
+history_file = 'run_history.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    bird_type TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    pipes_passed INTEGER NOT NULL,
+    difficulty_stage INTEGER NOT NULL,
+    duration_ticks INTEGER NOT NULL,
+    seed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_bird ON runs (bird_type, score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_day ON runs (day, score DESC);
+"""
+
+COLUMNS = ('played_at', 'day', 'bird_type', 'score', 'coins', 'pipes_passed', 'difficulty_stage', 'duration_ticks', 'seed')
+INSERT = f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# Runs queued within this many seconds of each other go in one transaction
+batch_window = 0.05
+max_batch = 500
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+def top_runs(connection, limit=10, bird_type=None, day=None):
+    """ Best runs, highest score first, optionally for one bird type or day """
+    where = []
+    params = []
+    if bird_type is not None:
+        where.append('bird_type = ?')
+        params.append(bird_type)
+    if day is not None:
+        where.append('day = ?')
+        params.append(day)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM runs"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY score DESC LIMIT ?'
+    rows = connection.execute(sql, params + [limit]).fetchall()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+def leaderboard(connection, bird_type, day, limit=3):
+    return {
+        'top': top_runs(connection, limit),
+        'bird': top_runs(connection, 1, bird_type=bird_type),
+        'today': top_runs(connection, 1, day=day),
+    }
+
+def today():
+    return time.strftime('%Y-%m-%d')
+
+class RunHistory:
+    """ Records runs and answers leaderboard queries on a worker thread that
+    owns the database, so the game loop never waits on SQLite. Queries are
+    answered after every run queued before them has been stored. """
+
+    def __init__(self, path=history_file):
+        self.path = path
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='run-history', daemon=True)
+        self.thread.start()
+
+    def record(self, state, bird_type, seed):
+        """ Queue a finished run from the simulation's final state """
+        self.tasks.put(('run', (time.time(), today(), bird_type, int(state['score']), state['coin_count'],
+                                state['pipes_passed'], state['difficulty_stage'], state['tick'], seed)))
+
+    def leaderboard(self, bird_type, day=None, limit=3):
+        """ Future for the top runs overall, the best for bird_type and the best of the day """
+        future = Future()
+        self.tasks.put(('query', (future, lambda connection: leaderboard(connection, bird_type, day or today(), limit))))
+        return future
+
+    def query(self, function):
+        """ Future for function(connection), run on the worker thread """
+        future = Future()
+        self.tasks.put(('query', (future, function)))
+        return future
+
+    def close(self):
+        # Waits for queued runs to be written
+        self.tasks.put(('stop', None))
+        self.thread.join()
+
+    def _run(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error as e:
+            print(f"Error opening run history: {e}. Runs will not be recorded.")
+            connection = None
+
+        waiting = None  # Task taken off the queue while collecting a batch
+        while True:
+            kind, payload = waiting or self.tasks.get()
+            waiting = None
+            if kind == 'run':
+                # Runs arriving close together share one transaction
+                rows = [payload]
+                deadline = time.monotonic() + batch_window
+                while len(rows) < max_batch:
+                    try:
+                        task = self.tasks.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if task[0] != 'run':
+                        waiting = task
+                        break
+                    rows.append(task[1])
+                self._insert(connection, rows)
+            elif kind == 'query':
+                self._answer(connection, *payload)
+            else:
+                break
+        if connection:
+            connection.close()
+
+    def _insert(self, connection, rows):
+        if not connection:
+            return
+        try:
+            with connection:
+                connection.executemany(INSERT, rows)
+        except sqlite3.Error as e:
+            print(f"Error recording runs: {e}")
+
+    def _answer(self, connection, future, function):
+        if not connection:
+            future.set_exception(sqlite3.OperationalError('run history is not available'))
+            return
+        try:
+            future.set_result(function(connection))
+        except sqlite3.Error as e:
+            future.set_exception(e)
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the run history leaderboard')
+    parser.add_argument('--db', default=history_file)
+    parser.add_argument('--top', type=int, default=10, help='number of runs to list')
+    parser.add_argument('--bird', help='only runs with this bird type')
+    parser.add_argument('--day', help="only runs on this day (YYYY-MM-DD, or 'today')")
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    day = today() if args.day == 'today' else args.day
+    start = time.perf_counter()
+    runs = top_runs(connection, args.top, args.bird, day)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    total = connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+    for rank, run in enumerate(runs, 1):
+        played = time.strftime('%Y-%m-%d %H:%M', time.localtime(run['played_at']))
+        print(f"{rank:3}. {run['score']:5}  {run['bird_type']:<7} coins {run['coins']:<4} "
+              f"stage {run['difficulty_stage']:<3} {run['duration_ticks'] / frame_rate:7.1f}s  {played}  seed {run['seed']}")
+    print(f"{len(runs)} of {total} runs in {elapsed_ms:.2f} ms")
+
+if __name__ == '__main__':
+    main()
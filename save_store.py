@@ -0,0 +1,131 @@
+import atexit
+import json
+import os
+import threading
+
+# Everything the game remembers between runs lives in one JSON file
+save_file = 'save_data.json'
+SAVE_VERSION = 1
+
+# Files written by earlier versions, read once when there is no save file yet
+legacy_high_score_file = 'highscore.txt'
+legacy_progress_file = 'bird_progress.json'
+
+class AtomicFileWriter:
+    """ Background thread that writes files for the game loop. write() only
+    queues the bytes; a newer write to the same path replaces one still
+    waiting. Each file is written to a temp file and renamed over the old
+    one, so a crash leaves either the old or the new contents, never half. """
+
+    def __init__(self):
+        self.pending = {}  # absolute path -> bytes
+        self.condition = threading.Condition()
+        self.thread = None
+        self.busy = False
+        self.requests = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def write(self, path, data):
+        path = os.path.abspath(path)
+        with self.condition:
+            if path in self.pending:
+                self.coalesced += 1
+            self.pending[path] = data
+            self.requests += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='save-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+            self.condition.notify()
+
+    def flush(self, timeout=None):
+        """ Wait until everything queued so far is on disk """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+        }
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending)
+                path, data = self.pending.popitem()
+                self.busy = True
+            try:
+                write_atomic(path, data)
+                self.writes += 1
+            except OSError as e:
+                self.errors += 1
+                print(f"Error saving {path}: {e}")
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+def write_atomic(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class SaveStore:
+    """ High score and bird progress in a single save file. Reads come from
+    memory; save() hands a snapshot to the background writer. """
+
+    def __init__(self, path=save_file, writer=None):
+        self.path = os.path.abspath(path)
+        self.writer = writer or AtomicFileWriter()
+        self.data = {
+            'version': SAVE_VERSION,
+            'high_score': 0,
+            'bird_high_scores': {},
+            'unlocked_birds': [],
+        }
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.data.update(json.load(f))
+            except (IOError, ValueError) as e:
+                print(f"Error loading save file: {e}")
+        else:
+            self._load_legacy_files()
+
+    def _load_legacy_files(self):
+        directory = os.path.dirname(self.path)
+        try:
+            with open(os.path.join(directory, legacy_high_score_file), 'r') as f:
+                self.data['high_score'] = int(f.read())
+        except (IOError, ValueError):
+            pass
+        try:
+            with open(os.path.join(directory, legacy_progress_file), 'r') as f:
+                progress = json.load(f)
+            self.data['bird_high_scores'] = progress.get('high_scores', {})
+            self.data['unlocked_birds'] = list(progress.get('unlocked_birds', []))
+        except (IOError, ValueError, AttributeError):
+            pass
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def update(self, **values):
+        self.data.update(values)
+        self.save()
+
+    def save(self):
+        self.writer.write(self.path, json.dumps(self.data, indent=2, sort_keys=True).encode('utf-8'))
+
+    def flush(self, timeout=None):
+        return self.writer.flush(timeout)
@@ -0,0 +1,783 @@
+import itertools
+import json
+import os
+import random
+from collections import deque, namedtuple
+from functools import lru_cache
+import pygame  # Only Rect, masks and sprite groups are used here, no display or mixer
+from asset_manager import resource_path
+from bird_registry import get_bird
+
+# Screen dimensions (the playfield the simulation runs in)
+screen_width = 288
+screen_height = 512
+
+# Game Difficulty Settings
+frame_rate = 60             # Simulation ticks per second of game time
+pipe_move_speed = 2.0
+pipe_spawn_interval = 1800  # Milliseconds between pipe pairs
+pipe_gap_size = 150
+min_pipe_spacing = 100      # New pipes keep at least this far from existing ones
+
+# Difficulty goes up every this many pipe pairs passed, speeding the pipes up by this factor
+pipes_per_difficulty_stage = 20
+difficulty_speed_increase = 1.05
+
+# Horizontally moving pipes, from the first difficulty stage on
+base_horizontal_pipe_speed = 1.0
+horizontal_pipe_speed_increase = 0.2
+base_pipe_horizontal_range = 30
+pipe_horizontal_range_increase = 5
+max_pipe_horizontal_range = 60  # Keeps movers from closing the gap too much
+
+# Pipe patterns are generated this many at a time, ahead of the player
+level_chunk = 32
+
+# Hand-authored courses (see load_course)
+courses_dir = 'courses'
+COURSE_VERSION = 1
+
+# Recycled sprites kept per simulation; enough for every pipe and coin on screen
+pipe_pool_size = 16
+coin_pool_size = 8
+
+# Sprite file the pipe collision masks are built from
+pipe_sprite = 'assets/sprites/pipe-green.png'
+
+def bird_frame_paths(bird_type):
+    """ Wing animation sprite files of a bird type, from the bird registry """
+    return list(get_bird(bird_type).sprites)
+
+_collision_masks = {}
+
+def collision_mask(path, flip_y=False, height=None):
+    """ Opaque pixels of a sprite file, built once per file and orientation.
+    A taller height extends the mask with solid rows below the image. """
+    key = (path, flip_y, height)
+    mask = _collision_masks.get(key)
+    if mask is None:
+        surface = pygame.image.load(resource_path(path))
+        if flip_y:
+            surface = pygame.transform.flip(surface, False, True)
+        mask = pygame.mask.from_surface(surface)
+        width, image_height = mask.get_size()
+        if height and height > image_height:
+            extended = pygame.Mask((width, height))
+            extended.draw(mask, (0, 0))
+            extended.draw(pygame.Mask((width, height - image_height), fill=True), (0, image_height))
+            mask = extended
+        _collision_masks[key] = mask
+    return mask
+
+def ms_to_ticks(milliseconds):
+    return round(milliseconds * frame_rate / 1000)
+
+class FixedTimestep:
+    """ Converts elapsed wall-clock milliseconds into whole simulation ticks.
+    A frame may catch up on at most max_backlog_ms of game time, so play keeps
+    to real time down to 1000 / max_backlog_ms frames per second (4 by default);
+    longer stalls are dropped and the game runs behind the clock. """
+
+    def __init__(self, tick_rate=frame_rate, max_backlog_ms=250):
+        self.tick_ms = 1000 / tick_rate
+        self.max_ticks_per_frame = max(1, round(max_backlog_ms / self.tick_ms))
+        self.accumulator = 0.0
+
+    def advance(self, elapsed_ms):
+        self.accumulator += elapsed_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        self.accumulator -= ticks * self.tick_ms
+        if ticks > self.max_ticks_per_frame:
+            # Too far behind (window dragged, machine stalled): drop the backlog
+            ticks = self.max_ticks_per_frame
+            self.accumulator = 0.0
+        return ticks
+
+    def alpha(self):
+        """ How far the time left over is into the next tick (0 to 1), for drawing between ticks """
+        return self.accumulator / self.tick_ms
+
+    def reset(self):
+        self.accumulator = 0.0
+
+def quantize_x(rect, x):
+    # Legacy physics keeps positions in whole pixels, rounded the way pygame.Rect stores them
+    rect.x = x
+    return rect.x
+
+def insert_by_x(order, sprite):
+    """ Insert sprite into a deque kept sorted by rect.x. New sprites spawn at
+    the right edge, so this rarely moves past more than the last entry. """
+    order.append(sprite)
+    i = len(order) - 1
+    x = sprite.rect.x
+    while i > 0 and order[i - 1].rect.x > x:
+        order[i] = order[i - 1]
+        i -= 1
+    order[i] = sprite
+
+def resort_by_x(order):
+    # Insertion sort: order is still sorted apart from the odd overtaking pipe
+    for i in range(1, len(order)):
+        sprite = order[i]
+        x = sprite.rect.x
+        j = i
+        while j > 0 and order[j - 1].rect.x > x:
+            order[j] = order[j - 1]
+            j -= 1
+        order[j] = sprite
+
+def collide_by_x(order, rect):
+    """ Sprites in an x-sorted deque whose rects overlap rect; the scan stops at
+    the first sprite that starts right of it """
+    hits = []
+    for sprite in order:
+        if sprite.rect.left >= rect.right:
+            break
+        if sprite.rect.colliderect(rect):
+            hits.append(sprite)
+    return hits
+
+class SpritePool:
+    """ Free list of killed sprites that are re-initialized with reset()
+    instead of being re-created. Sprites it creates release themselves back
+    into it when killed. """
+
+    def __init__(self, create, capacity):
+        self.create = create
+        self.capacity = capacity
+        self.free = []
+        self.allocations = 0
+        self.reuses = 0
+        self.discards = 0  # Released while the pool was already full
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args, **kwargs)
+            self.reuses += 1
+        else:
+            sprite = self.create(*args, **kwargs)
+            sprite.pool = self
+            self.allocations += 1
+        return sprite
+
+    def release(self, sprite):
+        if len(self.free) < self.capacity:
+            self.free.append(sprite)
+        else:
+            self.discards += 1
+
+    def stats(self):
+        return {
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'discards': self.discards,
+            'free': len(self.free),
+        }
+
+# Kills hand pooled sprites back to the pool they came from
+class PooledSprite(pygame.sprite.Sprite):
+    pool = None
+
+    def kill(self):
+        alive = self.alive()
+        super().kill()
+        if alive and self.pool:
+            self.pool.release(self)
+
+# Bird class (physics only, rendering lives in main.py)
+class Bird(pygame.sprite.Sprite):
+    width = 34
+    height = 24
+    animation_speed = 0.15
+
+    def __init__(self, bird_type='default'):
+        super().__init__()
+        self.bird_type = bird_type
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.rect.center = (50, screen_height // 2)
+        # Float position the rect is rounded from; prev_* is the position a tick
+        # earlier, for drawing in between ticks
+        self.x = self.prev_x = self.rect.x
+        self.y = self.prev_y = self.rect.y
+        self.velocity = 0
+        self.gravity = 0.25
+        self.flap_strength = -6
+        self.horizontal_speed = 0
+
+        # Wing animation frame; mask collision depends on which one is showing
+        self.frame_index = 0
+        self.animation_timer = 0
+
+        self._apply_bird_type_attributes()
+
+    def _apply_bird_type_attributes(self):
+        # Physics and frame count come from the bird registry (birds.json)
+        bird = get_bird(self.bird_type)
+        self.horizontal_speed = bird.horizontal_speed
+        self.gravity = bird.gravity
+        self.flap_strength = bird.flap_strength
+        self.frame_count = len(bird.sprites)
+
+    def update(self, legacy_physics=False):
+        self.animation_timer += self.animation_speed
+        if self.animation_timer >= 1:
+            self.frame_index = (self.frame_index + 1) % self.frame_count
+            self.animation_timer = 0
+
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.velocity += self.gravity
+        if legacy_physics:
+            # Whole pixels per tick, the fraction of the velocity dropped
+            self.y += int(self.velocity)
+        else:
+            self.y += self.velocity
+
+        # Horizontal steps stay whole pixels
+        if self.x < 50:
+            self.x += 1
+        elif self.horizontal_speed != 0:
+            self.x += int(self.horizontal_speed)
+
+        if self.y < 0:
+            self.y = 0
+            self.velocity = 0
+        self.rect.x = self.x
+        self.rect.y = self.y
+
+    def flap(self):
+        self.velocity = self.flap_strength
+
+# Pipe class
+class Pipe(PooledSprite):
+    width = 52
+    height = 320
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(*args, **kwargs)
+
+    def reset(self, x, y, position, current_horizontal_speed, is_horizontal_mover=False, horizontal_speed=0, horizontal_range=0, inverted=False, moving_forward=True):
+        self.pipe_type = position
+        self.inverted = inverted
+        self.passed = False
+        self.rect.size = (self.width, self.height)
+
+        # Store initial position for horizontal range calculation
+        self.initial_x = x
+        self.is_horizontal_mover = is_horizontal_mover
+        self.horizontal_speed = horizontal_speed
+        self.horizontal_range = horizontal_range
+        self.moving_forward = moving_forward # Direction a mover starts in
+
+        if position == 1:
+            self.rect.bottomleft = (x, y - pipe_gap_size // 2)
+        elif position == -1:
+            self.rect.topleft = (x, y + pipe_gap_size // 2)
+        self.x = self.prev_x = x
+        self.y = self.prev_y = self.rect.y
+
+        # Store the current horizontal speed (used for reference, not updated here)
+        self.current_horizontal_speed = current_horizontal_speed
+
+    def update(self, current_horizontal_speed, legacy_physics=False):
+        # Update base horizontal position
+        self.prev_x = self.x
+        x = self.x - current_horizontal_speed
+        if legacy_physics:
+            x = quantize_x(self.rect, x)
+
+        # Update additional horizontal movement if it's a horizontal mover
+        if self.is_horizontal_mover and self.horizontal_range > 0:
+            if self.moving_forward:
+                x += self.horizontal_speed
+                if legacy_physics:
+                    x = quantize_x(self.rect, x)
+                # Check if reached forward limit of range
+                if x >= self.initial_x + self.horizontal_range:
+                    self.moving_forward = False
+            else:
+                x -= self.horizontal_speed
+                if legacy_physics:
+                    x = quantize_x(self.rect, x)
+                # Check if reached backward limit of range
+                if x <= self.initial_x - self.horizontal_range:
+                    self.moving_forward = True
+
+        self.x = x
+        self.rect.x = x
+        if self.rect.right < 0:
+            self.kill()
+
+# Coin class
+class Coin(PooledSprite):
+    width = 20
+    height = 20
+
+    def __init__(self, x, y):
+        super().__init__()
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.rect.center = (x, y)
+        self.x = self.prev_x = self.rect.x
+        self.y = self.prev_y = self.rect.y
+
+    def update(self, current_horizontal_speed, legacy_physics=False):
+        # Move coin to the left using current_horizontal_speed
+        self.prev_x = self.x
+        x = self.x - current_horizontal_speed
+        if legacy_physics:
+            x = quantize_x(self.rect, x)
+        self.x = x
+        self.rect.x = x
+        if self.rect.right < 0:
+            self.kill()
+
+# One pipe pair with its optional coin, as the level describes it. The pair's
+# x position is chosen when it spawns, to keep clear of the pipes on screen.
+PipePattern = namedtuple('PipePattern', ['gap_y', 'top_moves', 'bottom_moves', 'horizontal_speed',
+                                         'horizontal_range', 'top_forward', 'bottom_forward', 'coin_y'])
+
+def difficulty_curve(index):
+    """ Difficulty stage of the index-th pipe pair. A pair spawns about when the
+    one before it is passed, so this matches the stage the player is on. """
+    return max(0, index - 1) // pipes_per_difficulty_stage
+
+def generate_pattern(rng, stage):
+    """ Random pipe pair for a difficulty stage. Draws from rng in the same
+    order the game always has, so seeds keep producing the same pipes. """
+    min_y = 100
+    max_y = screen_height - 100 - pipe_gap_size
+    if min_y >= max_y:
+        pipe_gap_center_y = screen_height // 2
+    else:
+        pipe_gap_center_y = rng.randint(min_y, max_y)
+
+    top_moves = False
+    bottom_moves = False
+    horizontal_speed = 0
+    horizontal_range = 0
+
+    # Introduce horizontal movement after the first difficulty increase
+    if stage > 0:
+        # Calculate movement probability, capped at 20%
+        movement_probability = min(0.2 * stage, 0.2)
+
+        # Increase chance of horizontal movers and their parameters with difficulty
+        if rng.random() < movement_probability:
+            horizontal_speed = base_horizontal_pipe_speed + stage * horizontal_pipe_speed_increase
+            horizontal_range = min(base_pipe_horizontal_range + stage * pipe_horizontal_range_increase,
+                                   max_pipe_horizontal_range)
+
+            # Decide which pipe(s) move horizontally: 50% both, otherwise one at random
+            if rng.random() < 0.5:
+                top_moves = bottom_moves = True
+            elif rng.choice([True, False]):
+                top_moves = True
+            else:
+                bottom_moves = True
+
+    # Start moving forward or backward randomly
+    top_forward = rng.choice([True, False])
+    bottom_forward = rng.choice([True, False])
+
+    # Add a coin randomly with a pipe pair
+    coin_y = None
+    if rng.random() < 0.5:  # 50% chance to spawn a coin
+        # Random position between pipes or in the gap
+        if rng.random() < 0.5:  # 50% chance to be in the gap
+            # Random height within the pipe gap, with some margin from the edges
+            min_coin_y = pipe_gap_center_y - (pipe_gap_size // 2) + 30  # 30 pixels from top pipe
+            max_coin_y = pipe_gap_center_y + (pipe_gap_size // 2) - 30  # 30 pixels from bottom pipe
+            coin_y = rng.randint(min_coin_y, max_coin_y)
+        else:  # 50% chance to be between pipes
+            coin_y = rng.randint(50, screen_height - 50)  # Keep away from screen edges
+
+    return PipePattern(pipe_gap_center_y, top_moves, bottom_moves, horizontal_speed, horizontal_range,
+                       top_forward, bottom_forward, coin_y)
+
+class LevelGenerator:
+    """ Endless pipe patterns from a seed and a difficulty curve (pair index ->
+    stage). Patterns are generated level_chunk at a time into a buffer that is
+    extended as the player advances, so spawning a pair is a pop. """
+
+    def __init__(self, seed, curve=difficulty_curve):
+        self.rng = random.Random(seed)
+        self.curve = curve
+        self.buffer = deque()
+        self.generated = 0
+        self.extend()
+
+    def extend(self):
+        for _ in range(level_chunk):
+            self.buffer.append(generate_pattern(self.rng, self.curve(self.generated)))
+            self.generated += 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.buffer:
+            self.extend()
+        return self.buffer.popleft()
+
+    def copy(self):
+        """ A generator that goes on with the same patterns as this one """
+        level = LevelGenerator.__new__(LevelGenerator)
+        level.rng = random.Random()
+        level.rng.setstate(self.rng.getstate())
+        level.curve = self.curve
+        level.buffer = deque(self.buffer)
+        level.generated = self.generated
+        return level
+
+def live_level(seed, sim):
+    """ Patterns made as each pair spawns, at the stage the game has reached.
+    Replays recorded before levels were generated ahead need this. """
+    rng = random.Random(seed)
+    while True:
+        yield generate_pattern(rng, sim.difficulty_stage)
+
+class Course:
+    """ Hand-authored level: a fixed list of patterns, played in a loop """
+
+    def __init__(self, name, patterns):
+        if not patterns:
+            raise ValueError(f"Course {name} has no pipes")
+        self.name = name
+        self.patterns = tuple(patterns)
+
+    def __iter__(self):
+        return itertools.cycle(self.patterns)
+
+    @classmethod
+    def from_dict(cls, name, data):
+        if data.get('version') != COURSE_VERSION:
+            raise ValueError(f"Course {name}: expected version {COURSE_VERSION}, found {data.get('version')}")
+        patterns = []
+        for entry in data['pipes']:
+            moves = entry.get('moves', 'none')
+            if moves not in ('none', 'top', 'bottom', 'both'):
+                raise ValueError(f"Course {name}: moves must be none, top, bottom or both, not {moves!r}")
+            moving = moves != 'none'
+            patterns.append(PipePattern(
+                gap_y=int(entry['gap_y']),
+                top_moves=moves in ('top', 'both'),
+                bottom_moves=moves in ('bottom', 'both'),
+                horizontal_speed=entry.get('horizontal_speed', base_horizontal_pipe_speed) if moving else 0,
+                horizontal_range=entry.get('horizontal_range', base_pipe_horizontal_range) if moving else 0,
+                top_forward=entry.get('forward', True),
+                bottom_forward=entry.get('forward', True),
+                coin_y=entry.get('coin_y'),
+            ))
+        return cls(name, patterns)
+
+@lru_cache(maxsize=None)
+def load_course(name):
+    """ Course from a file path, or by name from the courses directory """
+    path = name if os.path.exists(name) else resource_path(os.path.join(courses_dir, f'{name}.json'))
+    with open(path, 'r') as f:
+        data = json.load(f)
+    try:
+        return Course.from_dict(name, data)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Course {name} is missing or has a malformed field: {e}")
+
+class Simulation:
+    """ Display-free game core: advance one tick at a time with step(flap) """
+
+    # Entity classes, overridden by the renderer to attach images
+    bird_class = Bird
+    pipe_class = Pipe
+    coin_class = Coin
+
+    def __init__(self, bird_type='blue', seed=None, mask_collision=False, course=None, legacy_level=False,
+                 legacy_physics=False):
+        self.bird_type = bird_type
+        # Pipe hits tested on opaque pixels (after a rect pre-check) instead of rects
+        self.mask_collision = mask_collision
+        # Pipes come from a hand-authored Course when given, otherwise they are
+        # generated from the seed; legacy_level generates them as they spawn
+        self.course = course
+        self.legacy_level = legacy_level
+        # Positions are floats that rects are rounded from; legacy_physics snaps
+        # them to whole pixels every step, as replays recorded before expect
+        self.legacy_physics = legacy_physics
+        self.spawn_interval_ticks = ms_to_ticks(pipe_spawn_interval)
+        self.pipe_pool = SpritePool(self.pipe_class, pipe_pool_size)
+        self.coin_pool = SpritePool(self.coin_class, coin_pool_size)
+
+        self.pipes = pygame.sprite.Group()
+        self.coins = pygame.sprite.Group()
+        self.all_sprites = pygame.sprite.Group()
+
+        # Broad phase: live pipes and coins sorted by x, so collision, scoring
+        # and spawn spacing only look at the few near the bird or the right edge.
+        # Everything scrolls at the same speed, so the order only changes when a
+        # horizontally moving pipe is overtaken.
+        self.pipe_order = deque()
+        self.coin_order = deque()
+        self.moving_pipes = 0
+        self.pipes_spawned = 0
+
+        # Optional FrameProfiler charged with update, collision and scoring time
+        self.profiler = None
+        self.reset(bird_type, seed)
+
+    def reset(self, bird_type=None, seed=None):
+        if bird_type is not None:
+            self.bird_type = bird_type
+        # Every game gets a known seed so it can be replayed exactly
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        if self.course:
+            self.level = iter(self.course)
+        elif self.legacy_level:
+            self.level = live_level(seed, self)
+        else:
+            self.level = LevelGenerator(seed)
+        self.tick = 0
+        self.spawn_timer = 0
+        self.score = 0
+        self.coin_count = 0
+        self.pipes_passed_count = 0
+        self.pipe_move_speed = pipe_move_speed
+        self.difficulty_stage = 0
+        self.game_over = False
+
+        # Pipes and coins from the last game go back to their pools
+        for sprite in self.all_sprites.sprites():
+            sprite.kill()
+        self.pipe_order.clear()
+        self.coin_order.clear()
+        self.moving_pipes = 0
+        self.pipes_spawned = 0
+        self.bird = self.bird_class(self.bird_type)
+        self.all_sprites.add(self.bird)
+        if self.mask_collision:
+            self.bird_masks = [collision_mask(path) for path in bird_frame_paths(self.bird_type)]
+        self.create_pipe_pair()
+        return self.get_state()
+
+    def copy_state(self, other):
+        """ Make this game the same as other, a game of the same bird and level at
+        any tick, e.g. to rewind a predicted game to the one the server confirmed.
+        Levels generated as pipes spawn (legacy_level) cannot be copied. """
+        if self.course:
+            # Courses loop, so the pairs spawned so far give the position in one
+            self.level = itertools.islice(iter(self.course), other.pipes_spawned // 2, None)
+        elif isinstance(other.level, LevelGenerator):
+            self.level = other.level.copy()
+        else:
+            raise ValueError("Levels generated as pipes spawn cannot be copied")
+        self.seed = other.seed
+        self.tick = other.tick
+        self.spawn_timer = other.spawn_timer
+        self.score = other.score
+        self.coin_count = other.coin_count
+        self.pipes_passed_count = other.pipes_passed_count
+        self.pipe_move_speed = other.pipe_move_speed
+        self.difficulty_stage = other.difficulty_stage
+        self.game_over = other.game_over
+        self.pipes_spawned = other.pipes_spawned
+
+        for sprite in self.all_sprites.sprites():
+            sprite.kill()
+        self.pipe_order.clear()
+        self.coin_order.clear()
+        self.moving_pipes = 0
+        bird = self.bird
+        source = other.bird
+        bird.x, bird.y, bird.prev_x, bird.prev_y = source.x, source.y, source.prev_x, source.prev_y
+        bird.velocity = source.velocity
+        bird.frame_index = source.frame_index
+        bird.animation_timer = source.animation_timer
+        bird.rect.x = bird.x
+        bird.rect.y = bird.y
+        self.all_sprites.add(bird)
+
+        # Pooled sprites are set up as new ones, then given the other game's positions
+        for source in other.pipe_order:
+            pipe = self.pipe_pool.acquire(source.initial_x, 0, source.pipe_type, source.current_horizontal_speed,
+                                          is_horizontal_mover=source.is_horizontal_mover,
+                                          horizontal_speed=source.horizontal_speed,
+                                          horizontal_range=source.horizontal_range, inverted=source.inverted,
+                                          moving_forward=source.moving_forward)
+            pipe.rect.update(source.rect)
+            pipe.x, pipe.y, pipe.prev_x, pipe.prev_y = source.x, source.y, source.prev_x, source.prev_y
+            pipe.passed = source.passed
+            pipe.spawn_index = source.spawn_index
+            if pipe.is_horizontal_mover:
+                self.moving_pipes += 1
+            self.pipes.add(pipe)
+            self.all_sprites.add(pipe)
+            self.pipe_order.append(pipe)
+        for source in other.coin_order:
+            coin = self.coin_pool.acquire(0, 0)
+            coin.rect.update(source.rect)
+            coin.x, coin.y, coin.prev_x, coin.prev_y = source.x, source.y, source.prev_x, source.prev_y
+            self.coins.add(coin)
+            self.all_sprites.add(coin)
+            self.coin_order.append(coin)
+
+    def create_pipe_pair(self):
+        pattern = next(self.level)
+        pipe_gap_center_y = pattern.gap_y
+        current_pipe_width = self.pipe_class.width
+
+        # Check for overlap with existing pipes. Only pipes within spacing of the
+        # right edge can be close; they are checked in the order they spawned.
+        new_pipe_x = screen_width
+        near_edge = []
+        for pipe in reversed(self.pipe_order):
+            if pipe.rect.x <= new_pipe_x - min_pipe_spacing:
+                break
+            near_edge.append(pipe)
+        near_edge.sort(key=lambda pipe: pipe.spawn_index)
+        for pipe in near_edge:
+            # If there's a pipe within 100 pixels of the new pipe's position, adjust the new pipe's position
+            if abs(pipe.rect.x - new_pipe_x) < min_pipe_spacing:
+                new_pipe_x = pipe.rect.x + min_pipe_spacing
+
+        top_moves = pattern.top_moves
+        bottom_moves = pattern.bottom_moves
+        top_pipe = self.pipe_pool.acquire(new_pipe_x, pipe_gap_center_y, 1, self.pipe_move_speed,
+                                          is_horizontal_mover=top_moves,
+                                          horizontal_speed=pattern.horizontal_speed if top_moves else 0,
+                                          horizontal_range=pattern.horizontal_range if top_moves else 0,
+                                          inverted=True, moving_forward=pattern.top_forward)
+        bottom_pipe = self.pipe_pool.acquire(new_pipe_x, pipe_gap_center_y, -1, self.pipe_move_speed,
+                                             is_horizontal_mover=bottom_moves,
+                                             horizontal_speed=pattern.horizontal_speed if bottom_moves else 0,
+                                             horizontal_range=pattern.horizontal_range if bottom_moves else 0,
+                                             inverted=False, moving_forward=pattern.bottom_forward)
+
+        # Extend bottom pipe beyond screen
+        bottom_pipe.rect.height = screen_height * 2
+
+        self.pipes.add(top_pipe, bottom_pipe)
+        self.all_sprites.add(top_pipe, bottom_pipe)
+        for pipe in (top_pipe, bottom_pipe):
+            pipe.spawn_index = self.pipes_spawned
+            self.pipes_spawned += 1
+            if pipe.is_horizontal_mover:
+                self.moving_pipes += 1
+            insert_by_x(self.pipe_order, pipe)
+
+        if pattern.coin_y is not None:
+            coin = self.coin_pool.acquire(new_pipe_x + current_pipe_width + 20, pattern.coin_y)
+            self.coins.add(coin)
+            self.all_sprites.add(coin)
+            insert_by_x(self.coin_order, coin)
+
+    def step(self, flap=False):
+        """ Advance the game by one tick and return the new state """
+        if self.game_over:
+            return self.get_state()
+
+        self.tick += 1
+        if flap:
+            self.bird.flap()
+
+        self.spawn_timer += 1
+        if self.spawn_timer >= self.spawn_interval_ticks:
+            self.spawn_timer = 0
+            self.create_pipe_pair()
+
+        # Update pipes and coins with the current pipe_move_speed
+        self.pipes.update(self.pipe_move_speed, self.legacy_physics)
+        self.coins.update(self.pipe_move_speed, self.legacy_physics)
+        self.bird.update(self.legacy_physics)
+        profiler = self.profiler
+        if profiler:
+            profiler.lap('update')
+
+        # Pipes and coins that scrolled off screen were killed by their update
+        if self.moving_pipes:
+            resort_by_x(self.pipe_order)
+        while self.pipe_order and not self.pipe_order[0].alive():
+            if self.pipe_order.popleft().is_horizontal_mover:
+                self.moving_pipes -= 1
+        while self.coin_order and not self.coin_order[0].alive():
+            self.coin_order.popleft()
+
+        bird_rect = self.bird.rect
+        collected_coins = collide_by_x(self.coin_order, bird_rect)
+        for coin in collected_coins:
+            self.coin_order.remove(coin)
+            coin.kill()
+        collected = len(collected_coins)
+        self.coin_count += collected
+
+        pipe_hits = collide_by_x(self.pipe_order, bird_rect)
+        if pipe_hits and self.mask_collision:
+            pipe_hits = [pipe for pipe in pipe_hits if self.masks_overlap(pipe)]
+        if pipe_hits or bird_rect.bottom >= screen_height or bird_rect.top <= 0:
+            self.game_over = True
+        if profiler:
+            profiler.lap('collision')
+
+        # Only pipes left of the bird can have been passed
+        passed = 0
+        for pipe in self.pipe_order:
+            if pipe.rect.right >= bird_rect.left:
+                break
+            if not pipe.passed:
+                pipe.passed = True
+                if pipe.pipe_type == -1:
+                    passed += 1
+                    self.score += 1
+                    self.pipes_passed_count += 1
+                    if self.pipes_passed_count % pipes_per_difficulty_stage == 0:
+                        self.pipe_move_speed *= difficulty_speed_increase
+                        self.difficulty_stage += 1
+        if profiler:
+            profiler.lap('scoring')
+
+        return self.get_state(collected, passed)
+
+    def masks_overlap(self, pipe):
+        bird = self.bird
+        if pipe.pipe_type == 1:
+            pipe_mask = collision_mask(pipe_sprite, flip_y=True)
+        else:
+            pipe_mask = collision_mask(pipe_sprite, height=pipe.rect.height)
+        offset = (bird.rect.x - pipe.rect.x, bird.rect.y - pipe.rect.y)
+        return pipe_mask.overlap(self.bird_masks[bird.frame_index], offset) is not None
+
+    def next_pipes(self, count=2):
+        """ The bottom pipes of the next pipe pairs ahead of the bird, nearest first """
+        bird_left = self.bird.rect.left
+        ahead = []
+        for pipe in self.pipe_order:
+            if pipe.pipe_type == -1 and pipe.rect.right >= bird_left:
+                ahead.append(pipe)
+                if len(ahead) == count:
+                    break
+        return ahead
+
+    def pool_stats(self):
+        """ Sprite allocation counters; allocations stop growing once the pools are warm """
+        return {'pipes': self.pipe_pool.stats(), 'coins': self.coin_pool.stats()}
+
+    def get_state(self, collected=0, passed=0):
+        return {
+            'tick': self.tick,
+            'bird_x': self.bird.rect.x,
+            'bird_y': self.bird.rect.y,
+            'bird_velocity': self.bird.velocity,
+            'score': self.score,
+            'coin_count': self.coin_count,
+            'pipes_passed': self.pipes_passed_count,
+            'difficulty_stage': self.difficulty_stage,
+            'pipe_move_speed': self.pipe_move_speed,
+            'coins_collected': collected,
+            'pipes_cleared': passed,
+            'done': self.game_over,
+        }
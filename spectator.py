@@ -0,0 +1,330 @@
+import argparse
+import itertools
+import os
+import time
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from bird_registry import load_registry
+import simulation
+from simulation import frame_rate
+
+# The game can publish its state every tick into a ring of fixed-size records
+# in shared memory, for viewers on the in-venue screens. The game never waits
+# for a viewer: it overwrites the oldest record, and a viewer that falls behind
+# just reads the newest one. Each record carries a sequence number that is odd
+# while the game is writing it, so a viewer reading in place (no copy) can tell
+# when the record changed under it and drop that frame.
+default_ring_name = 'flappybird_state'
+ring_slots = 64
+RING_MAGIC = b'FBST'
+RING_VERSION = 2
+# A ring whose publisher has not written for this long is taken to be left behind
+stale_ring_seconds = 5.0
+
+GAME_STATES = ('start_screen', 'bird_select', 'game_active', 'game_over')
+
+PIPE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('inverted', 'u1')])
+COIN_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('frame', 'u1')])
+STATE_DTYPE = np.dtype([
+    ('sequence', '<u8'),
+    ('tick', '<u4'),
+    ('score', '<u4'),
+    ('coins', '<u4'),
+    ('high_score', '<u4'),
+    ('difficulty_stage', '<u2'),
+    ('game_state', 'u1'),
+    ('bird_type', 'u1'),   # Index into the bird registry's names
+    ('bird_frame', 'u1'),
+    ('pipe_count', 'u1'),
+    ('coin_count', 'u1'),  # Coins on screen, not collected
+    ('bird_x', '<f4'),
+    ('bird_y', '<f4'),
+    ('base_x', '<f4'),
+    ('background_x', '<f4'),
+    ('pipes', PIPE_DTYPE, (simulation.pipe_pool_size,)),
+    ('coin_items', COIN_DTYPE, (simulation.coin_pool_size,)),
+], align=True)
+no_pipes = [(0.0, 0.0, 0)] * simulation.pipe_pool_size
+no_coins = [(0.0, 0.0, 0)] * simulation.coin_pool_size
+HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('slots', '<u4'), ('record_size', '<u4'),
+                         ('latest', '<u8'), ('publisher_pid', '<u4'), ('heartbeat', '<f8')])
+HEADER_SIZE = 64
+
+def ring_size(slots):
+    return HEADER_SIZE + slots * STATE_DTYPE.itemsize
+
+class StateRing:
+    """ Header and record array over a shared memory block """
+
+    def __init__(self, memory, slots):
+        self.memory = memory
+        self.header = np.ndarray((), HEADER_DTYPE, buffer=memory.buf)
+        self.records = np.ndarray((slots,), STATE_DTYPE, buffer=memory.buf, offset=HEADER_SIZE)
+        # Views of the fields touched on every publish and read
+        self.sequences = self.records['sequence']
+        self.latest = self.header['latest']
+        self.heartbeat = self.header['heartbeat']
+        self.slots = slots
+
+    def close(self):
+        # The arrays point into the block, so they go before it does
+        del self.header, self.records, self.sequences, self.latest, self.heartbeat
+        self.memory.close()
+
+def process_alive(pid):
+    if os.name != 'posix':
+        # Elsewhere a block goes away with the last process holding it, so one
+        # that still exists has a live publisher
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Running, under another user
+    return True
+
+def ring_is_stale(memory):
+    """ True when no live game publishes to an existing block """
+    if memory.size < HEADER_SIZE:
+        return True
+    header = np.ndarray((), HEADER_DTYPE, buffer=memory.buf)
+    try:
+        if header['magic'] != RING_MAGIC or header['version'] != RING_VERSION:
+            return True
+        return not process_alive(int(header['publisher_pid'])) \
+            or time.time() - float(header['heartbeat']) > stale_ring_seconds
+    finally:
+        del header
+
+class StatePublisher:
+    """ Writes the game's state into the ring; publish() never blocks """
+
+    def __init__(self, name=default_ring_name, slots=ring_slots):
+        try:
+            memory = shared_memory.SharedMemory(name, create=True, size=ring_size(slots))
+        except FileExistsError:
+            # Only take over a ring left behind by a game that did not shut down;
+            # another running game keeps its ring and its spectators
+            existing = shared_memory.SharedMemory(name)
+            stale = ring_is_stale(existing)
+            if not stale:
+                # Attaching registered the block to be removed when this process exits
+                resource_tracker.unregister(existing._name, 'shared_memory')
+                existing.close()
+                raise FileExistsError(f"{name} is in use by another running game")
+            existing.close()
+            existing.unlink()
+            memory = shared_memory.SharedMemory(name, create=True, size=ring_size(slots))
+        self.ring = StateRing(memory, slots)
+        self.ring.records[:] = np.zeros((), STATE_DTYPE)
+        header = self.ring.header
+        header['latest'] = 0
+        header['magic'] = RING_MAGIC
+        header['version'] = RING_VERSION
+        header['slots'] = slots
+        header['record_size'] = STATE_DTYPE.itemsize
+        header['publisher_pid'] = os.getpid()
+        header['heartbeat'] = time.time()
+        self.sequence = 0
+        self.bird_types = {name: i for i, name in enumerate(load_registry().names)}
+
+    def publish(self, game):
+        sequence = self.sequence + 1
+        ring = self.ring
+        slot = sequence % ring.slots
+        ring.sequences[slot] = sequence * 2 - 1
+        sim = game.sim
+        bird = sim.bird
+        # Live pipes and coins, as many as fit (the pools are sized to hold them all),
+        # padded to the fixed record size
+        pipes = [(pipe.x, pipe.y, pipe.inverted) for pipe in itertools.islice(sim.pipe_order, simulation.pipe_pool_size)]
+        coins = [(coin.x, coin.y, getattr(coin, 'frame_index', 0))
+                 for coin in itertools.islice(sim.coin_order, simulation.coin_pool_size)]
+        # One assignment converts and copies the whole record
+        ring.records[slot] = (
+            sequence * 2 - 1, sim.tick, int(sim.score), sim.coin_count, int(game.high_score), sim.difficulty_stage,
+            GAME_STATES.index(game.game_state), self.bird_types.get(sim.bird_type, 0), bird.frame_index,
+            len(pipes), len(coins), bird.x, bird.y, game.base_x, game.background_x,
+            pipes + no_pipes[len(pipes):], coins + no_coins[len(coins):])
+        ring.sequences[slot] = sequence * 2
+        ring.latest[()] = sequence
+        ring.heartbeat[()] = time.time()
+        self.sequence = sequence
+
+    def close(self):
+        memory = self.ring.memory
+        self.ring.close()
+        memory.unlink()
+
+class StateReader:
+    """ Reads the newest record in place. Raises FileNotFoundError while no game publishes. """
+
+    def __init__(self, name=default_ring_name):
+        memory = shared_memory.SharedMemory(name)
+        # Before Python 3.13 attaching also registers the block to be removed
+        # when this process exits, which would take it away from the game
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        header = np.ndarray((), HEADER_DTYPE, buffer=memory.buf)
+        if header['magic'] != RING_MAGIC or header['version'] != RING_VERSION \
+                or header['record_size'] != STATE_DTYPE.itemsize:
+            del header
+            memory.close()
+            raise ValueError(f"{name} is not a version {RING_VERSION} game state ring")
+        slots = int(header['slots'])
+        del header
+        self.ring = StateRing(memory, slots)
+
+    def latest(self):
+        """ (sequence, record) of the newest state, the record a view into shared
+        memory; None before the first state or when it is being overwritten """
+        ring = self.ring
+        sequence = int(ring.latest)
+        if not sequence or ring.sequences[sequence % ring.slots] != sequence * 2:
+            return None
+        return sequence, ring.records[sequence % ring.slots]
+
+    def still_valid(self, sequence):
+        # False when the game lapped the ring and rewrote the record while it was read
+        return self.ring.sequences[sequence % self.ring.slots] == sequence * 2
+
+    def close(self):
+        self.ring.close()
+
+class SpectatorView:
+    """ Draws a state record with the game's own sprites """
+
+    def __init__(self):
+        import main
+        self.main = main
+        self.images = main.app.images
+        self.top_pipe = main.app.asset_manager.flipped('assets/sprites/pipe-green.png', False, True) \
+            if self.images.pipe else None
+        self.bird_names = load_registry().names
+        self.bird_frames = {}
+
+    def frames(self, bird_type):
+        frames = self.bird_frames.get(bird_type)
+        if frames is None:
+            frames = self.bird_frames[bird_type] = self.main.Bird(bird_type).frames
+        return frames
+
+    def draw(self, surface, record):
+        main = self.main
+        images = self.images
+        game_state = GAME_STATES[record['game_state']]
+        background_x = float(record['background_x'])
+        if images.background:
+            surface.blit(images.background, (background_x, 0))
+            surface.blit(images.background, (background_x + main.screen_width, 0))
+        else:
+            surface.fill((135, 206, 235))
+
+        if game_state in ('game_active', 'game_over'):
+            for pipe in record['pipes'][:record['pipe_count']]:
+                image = self.top_pipe if pipe['inverted'] else images.pipe
+                if image:
+                    surface.blit(image, (round(float(pipe['x'])), round(float(pipe['y']))))
+            if images.coin_frames:
+                for coin in record['coin_items'][:record['coin_count']]:
+                    frame = images.coin_frames[coin['frame'] % len(images.coin_frames)]
+                    surface.blit(frame, (round(float(coin['x'])), round(float(coin['y']))))
+            frames = self.frames(self.bird_names[record['bird_type'] % len(self.bird_names)])
+            surface.blit(frames[record['bird_frame'] % len(frames)],
+                         (round(float(record['bird_x'])), round(float(record['bird_y']))))
+
+        if images.base:
+            base_x = float(record['base_x'])
+            surface.blit(images.base, (base_x, main.base_y))
+            surface.blit(images.base, (base_x + main.screen_width, main.base_y))
+        self.draw_hud(surface, record, game_state)
+
+    def draw_hud(self, surface, record, game_state):
+        main = self.main
+        center_x = main.screen_width // 2
+        if game_state == 'game_active':
+            score_surface = main.render_score(int(record['score']))
+            surface.blit(score_surface, score_surface.get_rect(center=(center_x, main.UI_PADDING + 20)))
+            self.text(surface, f"Coins: {record['coins']}", (255, 255, 0), topleft=(main.UI_PADDING, main.UI_PADDING))
+        elif game_state == 'game_over':
+            if self.images.game_over:
+                surface.blit(self.images.game_over,
+                             self.images.game_over.get_rect(center=(center_x, main.screen_height // 2 - 80)))
+            self.text(surface, f"Score: {record['score']}", (255, 255, 255), main.app.font,
+                      center=(center_x, main.screen_height // 2))
+        elif self.images.message:
+            surface.blit(self.images.message, self.images.message.get_rect(center=(center_x, main.screen_height // 2 - 50)))
+        self.text(surface, f"High Score: {record['high_score']}", (255, 255, 255),
+                  bottomleft=(main.UI_PADDING, main.screen_height - 8))
+
+    def text(self, surface, text, color, font=None, **position):
+        text_surface = self.main.text_cache.render(font or self.main.app.small_font, text, color)
+        surface.blit(text_surface, text_surface.get_rect(**position))
+
+    def draw_waiting(self, surface, text):
+        surface.fill((0, 0, 0))
+        self.text(surface, text, (255, 255, 255), center=(self.main.screen_width // 2, self.main.screen_height // 2))
+
+def draw_latest(view, surface, reader, drawn):
+    """ Draw the newest state unless it is the one drawn last; returns its sequence,
+    or None when it was rewritten while being drawn. Views into the ring do not
+    outlive the call, so the reader can be closed at any time. """
+    latest = reader.latest()
+    if not latest or latest[0] == drawn:
+        return drawn
+    sequence, record = latest
+    view.draw(surface, record)
+    return sequence if reader.still_valid(sequence) else None
+
+def run_viewer(name=default_ring_name, fps=frame_rate, stale_seconds=2.0):
+    import pygame
+    view = SpectatorView()
+    screen = view.main.app.screen
+    pygame.display.set_caption('Flappy Bird - Spectator')
+    clock = pygame.time.Clock()
+    reader = None
+    drawn = 0
+    dropped = 0
+    last_change = time.monotonic()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        if reader is None:
+            try:
+                reader = StateReader(name)
+            except (FileNotFoundError, ValueError):
+                view.draw_waiting(screen, 'Waiting for a game')
+        if reader:
+            sequence = draw_latest(view, screen, reader, drawn)
+            now = time.monotonic()
+            if sequence is None:
+                # Torn: keep showing the last good frame
+                dropped += 1
+                clock.tick(fps)
+                continue
+            if sequence != drawn:
+                drawn = sequence
+                last_change = now
+            elif now - last_change > stale_seconds:
+                # The game stopped publishing; it may come back with a new ring
+                reader.close()
+                reader = None
+                drawn = 0
+                view.draw_waiting(screen, 'Waiting for a game')
+        pygame.display.flip()
+        clock.tick(fps)
+    if reader:
+        reader.close()
+    print(f"Frames dropped while being rewritten: {dropped}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch a game running with --spectate')
+    parser.add_argument('--name', default=default_ring_name, help='shared memory name the game publishes to')
+    parser.add_argument('--fps', type=int, default=frame_rate)
+    args = parser.parse_args()
+    run_viewer(args.name, args.fps)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bird_registry import load_registry
+import simulation
+
+# Longest game played before it is cut off (10 minutes of game time)
+default_max_steps = simulation.frame_rate * 60 * 10
+
+def gap_follower_policy(sim):
+    """ Baseline controller: flap when the bird sinks below the next gap """
+    bird = sim.bird
+    next_pipes = sim.next_pipes(1)
+    target_y = next_pipes[0].rect.top - 20 if next_pipes else simulation.screen_height // 2
+    return bird.rect.bottom > target_y and bird.velocity >= 0
+
+def play_game(policy, bird_type, seed, max_steps=default_max_steps):
+    sim = simulation.Simulation(bird_type, seed)
+    state = sim.get_state()
+    while not state['done'] and state['tick'] < max_steps:
+        state = sim.step(policy(sim))
+    return {
+        'bird_type': bird_type,
+        'seed': seed,
+        'score': state['score'],
+        'coins': state['coin_count'],
+        'pipes_passed': state['pipes_passed'],
+        'difficulty_stage': state['difficulty_stage'],
+        'steps': state['tick'],
+        'finished': state['done'],
+    }
+
+def _play_games(policy, games, max_steps):
+    return [play_game(policy, bird_type, seed, max_steps) for bird_type, seed in games]
+
+def run_tournament(policy, games_per_bird=100, bird_types=None, base_seed=0, workers=None,
+                   max_steps=default_max_steps, chunk_size=8):
+    """ Play seeded games for every bird type across a process pool,
+    yielding each game's result as soon as its chunk completes """
+    if bird_types is None:
+        bird_types = list(load_registry().names)
+    games = [(bird_type, base_seed + i) for bird_type in bird_types for i in range(games_per_bird)]
+    chunks = [games[i:i + chunk_size] for i in range(0, len(games), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_play_games, policy, chunk, max_steps) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def summarize(results):
+    summary = {}
+    for result in results:
+        stats = summary.setdefault(result['bird_type'], {
+            'games': 0, 'total_score': 0, 'max_score': 0, 'total_coins': 0,
+            'total_pipes_passed': 0, 'max_difficulty_stage': 0, 'total_steps': 0,
+        })
+        stats['games'] += 1
+        stats['total_score'] += result['score']
+        stats['max_score'] = max(stats['max_score'], result['score'])
+        stats['total_coins'] += result['coins']
+        stats['total_pipes_passed'] += result['pipes_passed']
+        stats['max_difficulty_stage'] = max(stats['max_difficulty_stage'], result['difficulty_stage'])
+        stats['total_steps'] += result['steps']
+
+    for stats in summary.values():
+        games = stats['games']
+        stats['mean_score'] = stats['total_score'] / games
+        stats['mean_coins'] = stats['total_coins'] / games
+        stats['mean_steps'] = stats['total_steps'] / games
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate a bird-control policy over many seeded games')
+    parser.add_argument('--games', type=int, default=100, help='games per bird type')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--max-steps', type=int, default=default_max_steps)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = []
+    for result in run_tournament(gap_follower_policy, args.games, base_seed=args.seed,
+                                 workers=args.workers, max_steps=args.max_steps):
+        results.append(result)
+        print(f"{result['bird_type']:>6} seed {result['seed']:>6}: score {result['score']}, "
+              f"coins {result['coins']}, stage {result['difficulty_stage']}, steps {result['steps']}")
+    elapsed = time.perf_counter() - start
+
+    for bird_type, stats in summarize(results).items():
+        print(f"{bird_type}: {stats['games']} games, mean score {stats['mean_score']:.2f}, "
+              f"max score {stats['max_score']}, mean coins {stats['mean_coins']:.2f}, "
+              f"max stage {stats['max_difficulty_stage']}, mean steps {stats['mean_steps']:.0f}")
+    print(f"{len(results)} games in {elapsed:.2f}s ({len(results) / elapsed:.1f} games/s)")
+
+if __name__ == '__main__':
+    main()